@@ -26,6 +26,10 @@ Yksityiskohtainen kuvaus:
    - Valittu työskirja avataan Mathcad Prime -sovelluksessa; sen jälkeen asetetaan työskirjan otsikko.
    - Ohjelma noutaa työskirjan syöte- ja tulostekohdat sekä suorittaa silmukan, jossa se muuttaa ensimmäisen syötteen arvoa annetulla arvovälillä, lukee kunkin iteraation laskutuloksen ja näyttää sen käyttöliittymässä.
    - Progressbaria päivitetään dynaamisesti silmukan edetessä, ja lopuksi Mathcad Prime suljetaan ja ohjelman suoritussilmukka päättyy.
+   - Itse laskenta on mathcad_sweep.run_sweep-funktiossa, joka ajetaan taustasäikeessä. Käyttöliittymä lukee viestit ja etenemisen
+     jonosta 'poll_events'-funktiolla, joten ikkuna ei jäädy. Saman ajon voi tehdä ilman käyttöliittymää: python mathcad_sweep.py <mcdx> <start> <end>.
+   - Jos ympäristömuuttuja MATHCAD_TIMING on asetettu (tiedostopolku), vaiheiden kestot mitataan (stage_timing) ja
+     yhteenveto tulostetaan sekä Chrome trace -tiedosto kirjoitetaan ajon päätyttyä.
 
 5. Ohjelman sulkeminen 'close_program()' sekä käyttöliittymän rakentaminen:
    - 'close_program()'-funktio vastaa Tkinter-ikkunan sulkemisesta, jolloin ohjelman suoritus päättyy.
@@ -34,14 +38,22 @@ Yksityiskohtainen kuvaus:
 """
 
 
-import os, runpy
+import os, queue, threading
 from tkinter import Tk, Button, Label, filedialog, Entry, Frame, Checkbutton, BooleanVar
 from tkinter.ttk import Progressbar
-from win32com.client import Dispatch
+import pythoncom
+import stage_timing
+from mathcad_sweep import run_sweep
+from stage_timing import stage
 
 # Global variables
 worksheet_path = None
 python_script_path = None  # Valittavan .py-tiedoston polku
+worker = None  # Laskennan taustasäie
+events = queue.Queue()  # Taustasäikeen tapahtumat käyttöliittymälle
+timing_path = os.environ.get("MATHCAD_TIMING")  # Vaiheiden ajanotto, trace-tiedoston polku
+if timing_path:
+    stage_timing.enable()
 
 
 def msg(m):
@@ -81,90 +93,75 @@ def choose_python_file():
 
 
 def run_mathcad():
-    global worksheet_path
+    global worker
     # Run Mathcad script
-    if worksheet_path:
+    if worksheet_path and not (worker and worker.is_alive()):
         try:
             # Get start and end values
             start_value = int(start_entry.get())  # Start value
             end_value = int(end_entry.get())  # End value
-
-            # Get Mathcad Prime COM object
-            mathcad = Dispatch("MathcadPrime.Application")
-            mathcad.Visible = visible_var.get()  # Set visibility based on the checkbox value
-            mathcad.Activate()
-
-            msg(f"Mathcad Prime was started successfully: {mathcad.GetVersion()}")
-
-            # Open the worksheet
-            msg(f"Opening file: {worksheet_path}")
-            worksheet = mathcad.Open(worksheet_path)
-
-            if not worksheet:
-                msg(f"Failed to open file: {worksheet_path}. Please check if the file is compatible with Mathcad Prime.")
-                return
-
-            worksheet.SetTitle("Title from Python Script")
-
-            # Get the first input
-            inputs = worksheet.Inputs
-            first_input = inputs.GetAliasByIndex(0)
-
-            # Loop through input values in the specified range
-            for value in range(start_value, end_value + 1):
-                msg(f"Using SetRealValue to change Input1 to {value}")
-                worksheet.SetRealValue(first_input, value, "")
-
-                # Get the first output
-                outputs = worksheet.Outputs
-                first_output = outputs.GetAliasByIndex(0)
-                val = worksheet.OutputGetRealValue(first_output)
-
-                # Display the result
-                if val:
-                    real_result = val.RealResult
-                    units = val.Units
-                    msg(f"For Input value {value}, Output1 = {real_result} {units}")
-
-                
-                # Aja valittu Python-skripti silmukan sisällä, jos sellainen on valittu
-                if python_script_path:
-                    msg(f"Running script: {os.path.basename(python_script_path)}")
-                    script_dir = os.path.dirname(python_script_path)
-                    script_name = os.path.basename(python_script_path)
-                    current_dir = os.getcwd()
-                    try:
-                        os.chdir(script_dir)
-                        exec(open(script_name).read(), {})
-                    except Exception as ex:
-                        msg(f"Error in script: {ex}")
-                    finally:
-                        os.chdir(current_dir)
-
-
-                # Update the progress bar
-                progress['value'] = (value - start_value) / (end_value - start_value) * 100
-                root.update_idletasks()
-
-                # Aja valittu Python-skripti silmukan sisällä, jos sellainen on valittu
-                if python_script_path:
-                    msg(f"Running script: {os.path.basename(python_script_path)}")
-                    script_dir = os.path.dirname(python_script_path)
-                    script_name = os.path.basename(python_script_path)
-                    current_dir = os.getcwd()
-                    try:
-                         msg(f"Running script in {script_dir}")
-                         runpy.run_path(python_script_path, run_name="__main__")
-                    except Exception as ex:
-                        msg(f"Error in script: {ex}")
-
-            # Close Mathcad Prime if possible
-            msg("Mathcad Prime will be closed if all open modified worksheets are saved and there are no other COM clients.")
-            mathcad.CloseAll(0)
-            mathcad.Quit(2)
-
-        except Exception as e:
+        except ValueError as e:
             msg(f"An error occurred: {e}")
+            return
+
+        # Laskenta ajetaan taustasäikeessä, käyttöliittymä lukee tapahtumat jonosta
+        progress['value'] = 0
+        run_button.config(state="disabled")
+        worker = threading.Thread(
+            target=sweep_worker,
+            args=(worksheet_path, start_value, end_value, visible_var.get(), python_script_path, 0),
+            daemon=True,
+        )
+        worker.start()
+        root.after(100, poll_events)
+
+def sweep_worker(worksheet_path, start_value, end_value, visible, python_script_path, recycle_after):
+    # COM pitää alustaa jokaisessa säikeessä erikseen
+    pythoncom.CoInitialize()
+    try:
+        run_sweep(worksheet_path, start_value, end_value, visible=visible,
+                  python_script_path=python_script_path, recycle_after=recycle_after,
+                  on_event=events.put)
+    except Exception as e:
+        events.put(("message", f"An error occurred: {e}"))
+    finally:
+        events.put(("done", None))
+        pythoncom.CoUninitialize()
+
+def poll_events():
+    # Päivitä käyttöliittymä taustasäikeen tapahtumilla
+    if events.empty():
+        root.after(100, poll_events)
+        return
+    done = False
+    with stage("gui_redraw"):
+        while not done:
+            try:
+                kind, data = events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "message":
+                msg(data)
+            elif kind == "progress":
+                progress['value'] = data
+            elif kind == "done":
+                run_button.config(state="normal")
+                done = True
+        root.update_idletasks()
+    if done:
+        write_timing()
+        return
+    root.after(100, poll_events)
+
+def write_timing():
+    # Ajanoton yhteenveto ja trace-tiedosto ajon päätyttyä
+    timer = stage_timing.current()
+    if timer:
+        timer.write_trace(timing_path)
+        print(timer.format_summary())
+        msg(f"Saved timing trace to {timing_path}")
+        # Seuraava ajo aloittaa tyhjästä, ettei trace ja yhteenveto sisällä edellisiä ajoja
+        timer.drain()
 
 def close_program():
     root.quit()
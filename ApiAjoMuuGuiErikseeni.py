@@ -26,6 +26,12 @@ Yksityiskohtainen kuvaus:
    - Valittu työskirja avataan Mathcad Prime -sovelluksessa; sen jälkeen asetetaan työskirjan otsikko.
    - Ohjelma noutaa työskirjan syöte- ja tulostekohdat sekä suorittaa silmukan, jossa se muuttaa ensimmäisen syötteen arvoa annetulla arvovälillä, lukee kunkin iteraation laskutuloksen ja näyttää sen käyttöliittymässä.
    - Progressbaria päivitetään dynaamisesti silmukan edetessä, ja lopuksi Mathcad Prime suljetaan ja ohjelman suoritussilmukka päättyy.
+   - Itse laskenta on mathcad_sweep.run_sweep-funktiossa, joka ajetaan taustasäikeessä. Käyttöliittymä lukee viestit ja etenemisen
+     jonosta 'poll_events'-funktiolla, joten ikkuna ei jäädy. Saman ajon voi tehdä ilman käyttöliittymää: python mathcad_sweep.py <mcdx> <start> <end>.
+   - Jos ympäristömuuttuja MATHCAD_TIMING on asetettu (tiedostopolku), vaiheiden kestot mitataan (stage_timing) ja
+     yhteenveto tulostetaan sekä Chrome trace -tiedosto kirjoitetaan ajon päätyttyä.
+   - Tässä versiossa Mathcad-istunto otetaan poolista (mathcad_session.MathcadSessionPool). Istunto pidetään lämpimänä ja kierrätetään
+     vasta 'Recycle Mathcad after N values' -laskennan jälkeen tai jos Mathcad kaatuu kesken laskennan, jolloin arvo lasketaan uudelleen.
 
 5. Ohjelman sulkeminen 'close_program()' sekä käyttöliittymän rakentaminen:
    - 'close_program()'-funktio vastaa Tkinter-ikkunan sulkemisesta, jolloin ohjelman suoritus päättyy.
@@ -34,14 +40,22 @@ Yksityiskohtainen kuvaus:
 """
 
 
-import os, runpy
+import os, queue, threading
 from tkinter import Tk, Button, Label, filedialog, Entry, Frame, Checkbutton, BooleanVar
 from tkinter.ttk import Progressbar
-from win32com.client import Dispatch
+import pythoncom
+import stage_timing
+from mathcad_sweep import run_sweep
+from stage_timing import stage
 
 # Global variables
 worksheet_path = None
 python_script_path = None  # Valittavan .py-tiedoston polku
+worker = None  # Laskennan taustasäie
+events = queue.Queue()  # Taustasäikeen tapahtumat käyttöliittymälle
+timing_path = os.environ.get("MATHCAD_TIMING")  # Vaiheiden ajanotto, trace-tiedoston polku
+if timing_path:
+    stage_timing.enable()
 
 
 def msg(m):
@@ -81,67 +95,76 @@ def choose_python_file():
 
 
 def run_mathcad():
-    global worksheet_path
-    if worksheet_path:
+    global worker
+    # Run Mathcad script
+    if worksheet_path and not (worker and worker.is_alive()):
         try:
-            start_value = int(start_entry.get())
-            end_value = int(end_entry.get())
-
-            # Loop through input values in the specified range
-            for value in range(start_value, end_value + 1):
-                msg(f"Opening Mathcad for Input value: {value}")
-                
-                # Käynnistä Mathcad Prime
-                mathcad = Dispatch("MathcadPrime.Application")
-                mathcad.Visible = visible_var.get()
-                mathcad.Activate()
-
-                # Avaa laskentalehti
-                worksheet = mathcad.Open(worksheet_path)
-                if not worksheet:
-                    msg(f"Failed to open file: {worksheet_path}")
-                    mathcad.Quit(2)
-                    continue
-
-                worksheet.SetTitle("Title from Python Script")
-
-                # Syötearvon asetus
-                inputs = worksheet.Inputs
-                first_input = inputs.GetAliasByIndex(0)
-                worksheet.SetRealValue(first_input, value, "")
-
-                # Tulosarvon lukeminen
-                outputs = worksheet.Outputs
-                first_output = outputs.GetAliasByIndex(0)
-                val = worksheet.OutputGetRealValue(first_output)
-
-                if val:
-                    real_result = val.RealResult
-                    units = val.Units
-                    msg(f"For Input value {value}, Output1 = {real_result} {units}")
-                else:
-                    msg(f"No result for input {value}")
-
-                # Aja valittu Python-skripti, jos määritelty
-                if python_script_path:
-                    try:
-                        msg(f"Running script: {os.path.basename(python_script_path)}")
-                        runpy.run_path(python_script_path, run_name="__main__")
-                    except Exception as ex:
-                        msg(f"Error in script: {ex}")
-
-                # Sulje Mathcad
-                msg("Closing Mathcad Prime...")
-                mathcad.CloseAll(0)
-                mathcad.Quit(2)
-
-                # Progress bar päivitys
-                progress['value'] = (value - start_value) / (end_value - start_value) * 100
-                root.update_idletasks()
-
-        except Exception as e:
+            # Get start and end values
+            start_value = int(start_entry.get())  # Start value
+            end_value = int(end_entry.get())  # End value
+            recycle_after = int(recycle_entry.get())
+        except ValueError as e:
             msg(f"An error occurred: {e}")
-
+            return
+
+        # Laskenta ajetaan taustasäikeessä, käyttöliittymä lukee tapahtumat jonosta
+        progress['value'] = 0
+        run_button.config(state="disabled")
+        worker = threading.Thread(
+            target=sweep_worker,
+            args=(worksheet_path, start_value, end_value, visible_var.get(), python_script_path, recycle_after),
+            daemon=True,
+        )
+        worker.start()
+        root.after(100, poll_events)
+
+def sweep_worker(worksheet_path, start_value, end_value, visible, python_script_path, recycle_after):
+    # COM pitää alustaa jokaisessa säikeessä erikseen
+    pythoncom.CoInitialize()
+    try:
+        run_sweep(worksheet_path, start_value, end_value, visible=visible,
+                  python_script_path=python_script_path, recycle_after=recycle_after,
+                  on_event=events.put)
+    except Exception as e:
+        events.put(("message", f"An error occurred: {e}"))
+    finally:
+        events.put(("done", None))
+        pythoncom.CoUninitialize()
+
+def poll_events():
+    # Päivitä käyttöliittymä taustasäikeen tapahtumilla
+    if events.empty():
+        root.after(100, poll_events)
+        return
+    done = False
+    with stage("gui_redraw"):
+        while not done:
+            try:
+                kind, data = events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "message":
+                msg(data)
+            elif kind == "progress":
+                progress['value'] = data
+            elif kind == "done":
+                run_button.config(state="normal")
+                done = True
+        root.update_idletasks()
+    if done:
+        write_timing()
+        return
+    root.after(100, poll_events)
+
+def write_timing():
+    # Ajanoton yhteenveto ja trace-tiedosto ajon päätyttyä
+    timer = stage_timing.current()
+    if timer:
+        timer.write_trace(timing_path)
+        print(timer.format_summary())
+        msg(f"Saved timing trace to {timing_path}")
+        # Seuraava ajo aloittaa tyhjästä, ettei trace ja yhteenveto sisällä edellisiä ajoja
+        timer.drain()
 
 def close_program():
     root.quit()
@@ -183,6 +206,13 @@ end_entry = Entry(root)
 end_entry.insert(0, "10")  # Default value
 end_entry.pack(pady=5)
 
+# Kuinka monen laskennan jälkeen Mathcad käynnistetään uudelleen (0 = ei koskaan)
+recycle_label = Label(root, text="Recycle Mathcad after N values:")
+recycle_label.pack(pady=5)
+recycle_entry = Entry(root)
+recycle_entry.insert(0, "10")  # Default value
+recycle_entry.pack(pady=5)
+
 # Checkbutton for Mathcad visibility
 visible_var = BooleanVar(value=False)  # Default is False (not visible)
 visibility_check = Checkbutton(root, text="Show Mathcad Window", variable=visible_var)
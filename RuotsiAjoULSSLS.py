@@ -2,6 +2,15 @@ import csv
 import os
 import subprocess
 
+def sls_file(name):
+    """ Uudempi tiedostoista sls_engine.py:n <nimi>-0.csv (kierot = 0) ja laskentalehden <nimi>.csv.
+    Vanha sls_engine-tulos ei siten ohita uudempaa laskentalehden ajoa. """
+    candidates = [path for path in (f"./TempFiles/{name}.csv", f"./TempFiles/{name}-0.csv") if os.path.exists(path)]
+    path = max(candidates, key=os.path.getmtime) if candidates else f"./TempFiles/{name}.csv"
+    print(f"{name}: {path}")
+    return path
+
+
 # 1. Luetaan results.csv ja otetaan toinen sarake (arvo TestName-muuttujaan)
 with open("./TempFiles/result.csv", newline='', encoding="utf-8") as f:
     reader = csv.reader(f)
@@ -10,7 +19,7 @@ with open("./TempFiles/result.csv", newline='', encoding="utf-8") as f:
 print("TestName:", TestName)
 
 # 2. Avataan SLS-chart-SLS-0.csv (tässä esimerkissä luetaan sama tiedosto kahdesti)
-chart_files = ["./TempFiles/SLS-chart-SLS-0.csv", "./TempFiles/SLS-chart-SLS-1.csv"]
+chart_files = [sls_file("SLS-chart-SLS-0"), sls_file("SLS-chart-SLS-1")]
 output_chart_file = f"./TempFiles/{TestName}-chart.csv"
 
 # Jos kohdetiedosto on jo olemassa, säilytetään sen nykyinen sisältö
@@ -34,7 +43,7 @@ with open(output_chart_file, "w", encoding="utf-8") as f_out:
 
 # 3. Luetaan SLS-data-1.csv, josta otetaan korvaavat arvot
 data_values = {}
-with open("./TempFiles/SLS-data-1.csv", newline='', encoding="utf-8") as f: #muokkaa tähän SLS-data-1-1.csv jos ei ole normi symmetrinen
+with open(sls_file("SLS-data-1"), newline='', encoding="utf-8") as f: #muokkaa tähän SLS-data-1-1.csv jos ei ole normi symmetrinen
     reader = csv.reader(f)
     for row in reader:
         # Esim. rivi: ["NmaxSLS", "1684.7"]
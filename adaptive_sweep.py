@@ -0,0 +1,100 @@
+"""
+Adaptiivinen näytteistys laskentasarjalle.
+
+Kiinteän kokonaislukuvälin sijaan aloitetaan harvasta tasavälisestä hilasta ja puolitetaan ne välit,
+joilla tulos muuttuu liikaa tai joiden päätepisteissä käyrä kääntyy jyrkästi (N–M-käyrän kulmat).
+Näin sama käyrän tarkkuus saavutetaan murto-osalla laskentalehden laskennoista.
+
+Kriteerit, molemmat suhteessa tuloksen vaihteluväliin (max - min tähän asti lasketuista):
+    max_deviation   pisteen poikkeama naapuripisteiden välisestä suorasta (kaarevuus)
+    max_change      tuloksen muutos yhden välin yli (None = ei käytössä)
+
+Jos tuloksia on useita (esim. N ja M), kriteeri lasketaan jokaiselle ja suurin ratkaisee.
+Näytteistys loppuu, kun mikään väli ei ylitä toleranssia, kun max_points on käytetty tai kun
+välit ovat kaventuneet alle min_step-arvon.
+
+Käyttö:
+    sampler = AdaptiveSampler(1, 101, outputs=["N", "M"], max_points=40)
+    for value in sampler:
+        sampler.add(value, backend.evaluate(value))
+"""
+
+
+class AdaptiveSampler:
+    """ Tuottaa laskettavat syötearvot kierroksittain; tulokset annetaan add-metodilla. """
+
+    def __init__(self, start, end, outputs=None, coarse_points=11, max_deviation=0.01, max_change=None,
+                 max_points=101, min_step=None):
+        self.start = float(start)
+        self.end = float(end)
+        # None = käytetään ensimmäistä tulosta
+        self.outputs = list(outputs) if outputs else None
+        self.coarse_points = max(coarse_points, 2)
+        self.max_deviation = max_deviation
+        self.max_change = max_change
+        self.max_points = max_points
+        self.min_step = min_step if min_step is not None else (self.end - self.start) * 1e-4
+        self.points = {}
+
+    def add(self, value, outputs):
+        """ Tallentaa arvon tulokset; tyhjä tulos merkitään puuttuvaksi eikä sitä käytetä kriteereissä. """
+        if outputs and self.outputs is None:
+            self.outputs = [next(iter(outputs))]
+        if outputs and all(alias in outputs for alias in self.outputs):
+            self.points[value] = [outputs[alias][0] for alias in self.outputs]
+        else:
+            self.points[value] = None
+
+    def __iter__(self):
+        step = (self.end - self.start) / (self.coarse_points - 1)
+        coarse = [self.start + i * step for i in range(self.coarse_points - 1)] + [self.end]
+        yield from coarse[:self.max_points]
+
+        while len(self.points) < self.max_points:
+            candidates = self._refine_candidates()
+            if not candidates:
+                break
+            yield from candidates[:self.max_points - len(self.points)]
+
+    def _refine_candidates(self):
+        """ Palauttaa puolitettavien välien keskipisteet tärkeimmästä alkaen. """
+        known = sorted((value, y) for value, y in self.points.items() if y is not None)
+        if len(known) < 2:
+            return []
+
+        # Skaalaus tuloksen vaihteluvälillä, jotta toleranssit ovat suhteellisia
+        scales = []
+        for k in range(len(self.outputs)):
+            column = [y[k] for value, y in known]
+            scales.append((max(column) - min(column)) or 1.0)
+
+        def normalized_diff(a, b):
+            return max(abs(a[k] - b[k]) / scales[k] for k in range(len(scales)))
+
+        scores = [0.0] * (len(known) - 1)
+
+        if self.max_change is not None:
+            for i in range(len(known) - 1):
+                change = normalized_diff(known[i][1], known[i + 1][1])
+                if change > self.max_change:
+                    scores[i] = max(scores[i], change / self.max_change)
+
+        if self.max_deviation is not None:
+            for i in range(1, len(known) - 1):
+                (x0, y0), (x1, y1), (x2, y2) = known[i - 1], known[i], known[i + 1]
+                t = (x1 - x0) / (x2 - x0)
+                predicted = [a + t * (b - a) for a, b in zip(y0, y2)]
+                deviation = normalized_diff(y1, predicted)
+                if deviation > self.max_deviation:
+                    score = deviation / self.max_deviation
+                    scores[i - 1] = max(scores[i - 1], score)
+                    scores[i] = max(scores[i], score)
+
+        candidates = []
+        for i, score in enumerate(scores):
+            a, b = known[i][0], known[i + 1][0]
+            midpoint = (a + b) / 2
+            if score > 0 and (b - a) / 2 >= self.min_step and midpoint not in self.points:
+                candidates.append((score, midpoint))
+        candidates.sort(reverse=True)
+        return [midpoint for score, midpoint in candidates]
@@ -0,0 +1,102 @@
+"""
+Ajettavien vaiheiden käynnistysajan mittaus.
+
+Putki käynnistää vaiheet (yhdistys4.py, datasheet.py, datasheetSLS.py, ...) jokaiselle tuotteelle
+omana prosessinaan (subprocess.run) tai tuo ne moduuleina (runpy, mathcad_sweep --script). Tämä skripti
+mittaa jokaisen vaiheen tuonnin uudessa Python-prosessissa:
+    cold     ensimmäinen käynnistys (levyvälimuisti ja __pycache__ sellaisina kuin ne ovat)
+    warm     seuraavien käynnistysten mediaani
+    import   moduulin tuonti prosessin sisällä (warm-ajojen mediaani, ilman tulkin käynnistystä)
+    heavy    raskaat kirjastot, jotka tuonti latasi (pandas, scipy, matplotlib, reportlab, pdfrw)
+Rivi "(python)" on tyhjän tulkin käynnistys vertailuksi.
+
+--history FILE lisää ajon tulokset JSON-rivinä tiedoston loppuun, jolloin muutoksia voi seurata.
+
+Käyttö:
+    python bench_startup.py
+    python bench_startup.py yhdistys4 datasheet --repeat 10 --history bench_startup.jsonl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ENTRY_POINTS = ["yhdistys4", "datasheet", "datasheetSLS", "nm_engine", "sls_engine", "mathcad_sweep"]
+HEAVY_MODULES = ["pandas", "scipy", "matplotlib", "reportlab", "pdfrw"]
+
+# Ajetaan uudessa prosessissa: tuonnin kesto ja ladatut raskaat kirjastot JSON-muodossa
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+error = None
+try:
+    import {module}
+except Exception as exc:
+    error = repr(exc)
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"import": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+def launch(code, cwd):
+    """ Käynnistää tulkin ja palauttaa (seinäkelloaika, viimeisen tulosterivin JSON tai None). """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    lines = result.stdout.strip().splitlines()
+    return elapsed, (json.loads(lines[-1]) if lines else None)
+
+
+def measure(module, repeat=5, cwd="."):
+    """ cold, warm ja import -ajat sekunteina sekä ladatut raskaat kirjastot yhdelle moduulille. """
+    code = "pass" if module is None else _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    cold, probe = launch(code, cwd)
+    warm, imports = [], []
+    for _ in range(repeat):
+        elapsed, probe = launch(code, cwd)
+        warm.append(elapsed)
+        if probe:
+            imports.append(probe["import"])
+    return {
+        "cold": cold,
+        "warm": statistics.median(warm) if warm else cold,
+        "import": statistics.median(imports) if imports else None,
+        "heavy": probe["heavy"] if probe else [],
+        "error": probe["error"] if probe else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold and warm start-up time of pipeline entry points.")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="Modules to import (default: all stages)")
+    parser.add_argument("--repeat", type=int, default=5, help="Warm launches per module")
+    parser.add_argument("--history", metavar="FILE", help="Append results as a JSON line")
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    results = {"(python)": measure(None, args.repeat, cwd)}
+    for module in args.modules:
+        results[module] = measure(module, args.repeat, cwd)
+
+    print(f"{'entry point':<16}{'cold [ms]':>11}{'warm [ms]':>11}{'import [ms]':>13}  heavy")
+    for name, r in results.items():
+        imported = f"{r['import'] * 1000:>13.0f}" if r["import"] is not None else f"{'':>13}"
+        note = f"  ERROR {r['error']}" if r["error"] else ""
+        print(f"{name:<16}{r['cold'] * 1000:>11.0f}{r['warm'] * 1000:>11.0f}{imported}  "
+              f"{', '.join(r['heavy']) or '-'}{note}")
+
+    if args.history:
+        record = {"time": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+                  "repeat": args.repeat, "results": results}
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Usean tuotteen datalehdet yhdessä prosessissa.
+
+datasheet.py ja datasheetSLS.py tekevät yhden datalehden (result.csv:n ensimmäinen rivi) ja lukevat
+joka kerta pohjan DatasheetPohja.pdf, rekisteröivät fontit ja luovat uuden kuvan. DatasheetRenderer
+tekee nämä kerran ja käyttää niitä kaikille tuotteille:
+    tausta      pohja ja asettelun kiinteät tekstit (STATIC_TEXTS: otsikot, selitteet, kuvatekstit,
+                vastuuvapaus) piirretään kerran yhdeksi lomakkeeksi (pdfrw pagexobj), joka piirretään
+                jokaisen datalehden taustaksi; tuotteelle piirretään vain sen omat arvot
+    fontit      OpenSans rekisteröidään reportlabiin ja matplotlibiin kerran prosessissa (font_service);
+                pohjan upotetut fontit karsitaan käytettyihin merkkeihin (compact_template)
+    kuvat       tuotekuvat (JatkosKuvat) pienennetään piirtokokoon (image_cache) ja puretaan kerran;
+                sama kuva on kaikilla tuotteilla yksi ImageReader
+    käyrä       sama matplotlib Figure tyhjennetään ja piirretään uudelleen vektorilomakkeeksi
+Datalehden sisältö (tekstit ja kuvien paikat) tulee datasheet- tai datasheetSLS-moduulin
+page_content-funktiosta, joten tulos on sama kuin yksittäisajossa.
+
+Tuote on testitiedosto (<nimi>.csv) ja sen käyrätiedosto (<nimi>-chart.csv); SLS-datalehdelle
+lisäksi valinnainen SLS-datatiedosto. Ilman SLS-tiedostoa NmaxSLS, NminSLS ja NMmaxSLS luetaan
+testitiedostosta (sls_engine.py --update-test-file tai RuotsiAjoULSSLS.py täyttää ne).
+
+Tuotelista annetaan
+    tiedostoina        python datasheet_batch.py ./TempFiles/*.csv       (-chart.csv-pari etsitään)
+    taulukkona         python datasheet_batch.py --products tuotteet.csv  (sarakkeet test, chart, sls)
+    result.csv:nä      python datasheet_batch.py --result ./TempFiles/result.csv  (kaikki rivit)
+
+    python datasheet_batch.py --sls --out ./Datalehdet ./TempFiles/*.csv
+
+--workers N jakaa tuotteet N prosessille (0 = kaikki ytimet); jokainen prosessi alustaa oman
+DatasheetRendererin kerran. Tiedostonimet (Nimi + Fck [+ mc/ms]) tarkistetaan ennen piirtämistä, ja
+päällekkäiset nimet keskeyttävät ajon ennen kuin yhtään tiedostoa kirjoitetaan.
+
+--catalogue FILE kirjoittaa kaikki datalehdet yhdeksi monisivuiseksi PDF:ksi (myyntiluettelo).
+Taustalomake, fontit ja samat tuotekuvat ovat tiedostossa kerran, joten luettelo on murto-osa
+erillisten datalehtien yhteiskoosta. Luettelo tehdään yhdessä prosessissa (--workers ei vaikuta).
+
+    python datasheet_batch.py --result ./TempFiles/result.csv --catalogue ./Datalehdet/Luettelo.pdf
+
+--incremental piirtää vain datalehdet (tai luettelon), joiden syötteet ovat muuttuneet edellisestä
+ajosta; syötteiden tiivisteet ovat manifestissa (datasheet_manifest.py, oletuksena
+<out>/datasheet-manifest.json tai luettelon kansiossa).
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import importlib
+import io
+import os
+import time
+from multiprocessing import Pool
+
+from datasheet_draw import chart_form, draw_images, draw_texts
+from font_service import compact_template, register_reportlab_fonts, share_glyph_procs
+from image_cache import ImageCache
+
+def layout_version(module):
+    """ Asettelun tarkiste: kiinteät tekstit sekä fonttitiedostojen koko ja muutosaika. """
+    digest = hashlib.sha1(repr(module.STATIC_TEXTS).encode('utf-8'))
+    for path in (module.OPEN_SANS_REGULAR, module.OPEN_SANS_BOLD):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+# Taustalomakkeet (lomake, sivukoko) avaimella (asettelumoduuli, asettelun tarkiste, pohja, pohjan muutosaika)
+_backgrounds = {}
+
+
+def background_form(module, template='DatasheetPohja.pdf'):
+    """ Pohjan ensimmäinen sivu ja asettelun kiinteät tekstit yhtenä pdfrw-lomakkeena sekä sivun koko.
+    Lomake tehdään kerran prosessissa pohjaa ja asettelun versiota kohden. """
+    stat = os.stat(template)
+    key = (module.__name__, layout_version(module), os.path.abspath(template), stat.st_size, stat.st_mtime_ns)
+    cached = _backgrounds.get(key)
+    if cached is not None:
+        return cached
+
+    from pdfrw import PdfReader
+    from pdfrw.buildxobj import pagexobj
+    from pdfrw.toreportlab import makerl
+    from reportlab.pdfgen import canvas
+
+    page = PdfReader(compact_template(template)).pages[0]
+    x0, y0, x1, y1 = (float(v) for v in page.MediaBox)
+    page_size = (x1 - x0, y1 - y0)
+
+    register_reportlab_fonts()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=page_size, pageCompression=1)
+    c.doForm(makerl(c, pagexobj(page)))
+    draw_texts(c, module.STATIC_TEXTS)
+    c.showPage()
+    c.save()
+    buffer.seek(0)
+
+    cached = _backgrounds[key] = (pagexobj(PdfReader(buffer).pages[0]), page_size)
+    return cached
+
+
+class DatasheetRenderer:
+    """ Tekee datalehtiä samalla pohjalla, fonteilla, kuvilla ja kuvaajalla. """
+
+    def __init__(self, sls=False, template='DatasheetPohja.pdf', out_dir='.'):
+        from matplotlib.figure import Figure
+        from reportlab import rl_config
+
+        # Kuvat binäärisinä virtoina: reportlabin ASCII85-koodaus on puhdasta Pythonia ja hidas
+        rl_config.useA85 = 0
+
+        self.sls = sls
+        self.module = layout_module(sls)
+        self.out_dir = out_dir
+
+        register_reportlab_fonts()
+        self.background, self.page_size = background_form(self.module, template)
+        self.figure = Figure(figsize=(10, 6))
+        self.images = ImageCache()
+        self._glyph_procs = {}
+        self._images = {}
+
+    def image(self, path, width, height):
+        """ Piirtokokoon pienennetty ja purettu kuva välimuistista (reportlab ImageReader). """
+        prepared = self.images.prepared(path, width, height)
+        reader = self._images.get(prepared)
+        if reader is None:
+            from reportlab.lib.utils import ImageReader
+            reader = self._images[prepared] = ImageReader(prepared)
+        return reader
+
+    def chart_image(self, chart_data, variables):
+        """ N–M-kuvaaja vektorilomakkeena (chart_form); sama Figure käytetään uudelleen. Kuvaajien samat
+        merkit jaetaan (share_glyph_procs), joten luettelossa kukin merkki on tiedostossa kerran. """
+        return share_glyph_procs(chart_form(self.module.draw_chart, chart_data, variables, self.figure), self._glyph_procs)
+
+    def content(self, product):
+        """ Tuotteen page_content ilman kiinteitä tekstejä: (tekstit, kuvat, PDF-nimi ilman .pdf). """
+        variables, chart_data, sls_variables = load_product(self.module, product)
+        chart = self.chart_image(chart_data, variables)
+        if not self.sls:
+            return self.module.page_content(variables, chart_image=chart, static=False)
+        return self.module.page_content(variables, sls_variables, chart_image=chart, static=False)
+
+    def draw_page(self, c, texts, images):
+        """ Piirtää datalehden (content-funktion tekstit ja kuvat) canvakselle taustalomakkeen päälle. """
+        from pdfrw.toreportlab import makerl
+
+        c.doForm(makerl(c, self.background))
+        draw_texts(c, texts)
+        # Tiedostopolut vaihdetaan välimuistin kuviin; kuvaaja on valmiiksi lomake
+        draw_images(c, [{**info, 'image': self.image(info['image'], info['width'], info['height'])}
+                        if isinstance(info['image'], str) else info for info in images])
+
+    def render(self, product):
+        """ Tekee tuotteen datalehden ja palauttaa PDF-tiedoston polun. """
+        from reportlab.pdfgen import canvas
+
+        texts, images, name = self.content(product)
+        path = os.path.join(self.out_dir, f"{name}.pdf")
+
+        c = canvas.Canvas(path, pagesize=self.page_size, pageCompression=1)
+        self.draw_page(c, texts, images)
+        c.showPage()
+        c.save()
+        return path
+
+    def render_catalogue(self, products, path):
+        """ Kaikki datalehdet yhdeksi monisivuiseksi PDF:ksi. Taustalomake (pohja ja kiinteät tekstit),
+        fontit ja toistuvat tuotekuvat kirjoitetaan tiedostoon kerran ja sivut viittaavat niihin.
+        Jokaisesta sivusta tulee kirjanmerkki datalehden nimellä. Palauttaa tiedoston polun. """
+        from reportlab.pdfgen import canvas
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        c = canvas.Canvas(path, pagesize=self.page_size, pageCompression=1)
+        c.setTitle(os.path.splitext(os.path.basename(path))[0])
+        for number, product in enumerate(products):
+            texts, images, name = self.content(product)
+            self.draw_page(c, texts, images)
+            c.bookmarkPage(f"p{number}")
+            c.addOutlineEntry(name, f"p{number}")
+            c.showPage()
+        c.showOutline()
+        c.save()
+        return path
+
+    def render_all(self, products):
+        """ Tekee kaikki datalehdet; palauttaa PDF-polut samassa järjestyksessä. """
+        os.makedirs(self.out_dir, exist_ok=True)
+        return [self.render(product) for product in products]
+
+
+def layout_module(sls=False):
+    """ Datalehden asettelumoduuli: datasheet tai datasheetSLS. """
+    return importlib.import_module('datasheetSLS' if sls else 'datasheet')
+
+
+def load_product(module, product):
+    """ Tuotteen (muuttujat, käyrät, SLS-muuttujat). Ilman SLS-tiedostoa SLS-arvot ovat testitiedostossa. """
+    variables = module.parse_variable_values(module.read_csv_file(product['test']))
+    chart_data = module.parse_chart_data(module.read_csv_file(product['chart']))
+    sls_file = product.get('sls')
+    sls_variables = module.parse_variable_values(module.read_csv_file(sls_file)) if sls_file else variables
+    return variables, chart_data, sls_variables
+
+
+def output_names(products, sls=False):
+    """ Datalehtien tiedostonimet (ilman .pdf) page_content-funktiosta ilman piirtämistä. """
+    module = layout_module(sls)
+    names = []
+    for product in products:
+        variables, _, sls_variables = load_product(module, product)
+        args = (variables, sls_variables) if sls else (variables,)
+        names.append(module.page_content(*args, chart_image=None, static=False)[2])
+    return names
+
+
+def check_output_names(products, sls=False):
+    """ Varmistaa ennen piirtämistä, ettei kaksi tuotetta kirjoita samaan tiedostoon. Nimet verrataan
+    kirjainkoosta riippumatta, koska Windowsin tiedostojärjestelmä ei erota niitä. """
+    seen = {}
+    collisions = []
+    for product, name in zip(products, output_names(products, sls)):
+        key = name.casefold()
+        if key in seen:
+            collisions.append(f"{name}.pdf: {seen[key]['test']} and {product['test']}")
+        else:
+            seen[key] = product
+    if collisions:
+        raise ValueError("Datasheet output names collide:\n  " + "\n  ".join(collisions))
+
+
+# Työprosessin renderöijä; luodaan kerran prosessia kohden (_init_worker)
+_worker_renderer = None
+
+
+def _init_worker(sls, template, out_dir):
+    global _worker_renderer
+    _worker_renderer = DatasheetRenderer(sls, template, out_dir)
+
+
+def _render_in_worker(product):
+    return _worker_renderer.render(product)
+
+
+def render_parallel(products, sls=False, template='DatasheetPohja.pdf', out_dir='.', workers=None):
+    """ Tekee datalehdet workers-prosessissa (oletuksena kaikki ytimet). Jokainen prosessi alustaa
+    pohjan ja fontit kerran ja saa oman osajoukkonsa tuotteista. Tiedostonimet tarkistetaan ensin
+    (check_output_names). Palauttaa PDF-polut tuotteiden järjestyksessä. """
+    check_output_names(products, sls)
+    workers = min(workers or os.cpu_count() or 1, len(products))
+    if workers <= 1:
+        return DatasheetRenderer(sls, template, out_dir).render_all(products)
+
+    os.makedirs(out_dir, exist_ok=True)
+    # Muutama pala prosessia kohden tasaa kuormaa, kun datalehtien koko vaihtelee
+    chunksize = max(1, len(products) // (workers * 4))
+    with Pool(workers, initializer=_init_worker, initargs=(sls, template, out_dir)) as pool:
+        return pool.map(_render_in_worker, products, chunksize)
+
+
+def _product(test_file, chart_file=None, sls_file=None):
+    chart_file = chart_file or os.path.splitext(test_file)[0] + '-chart.csv'
+    return {'test': test_file, 'chart': chart_file, 'sls': sls_file or None}
+
+
+def products_from_files(paths):
+    """ Testitiedostot, joilla on <nimi>-chart.csv-pari; käyrä- ja SLS-tiedostot ohitetaan. """
+    products = []
+    for path in paths:
+        base = os.path.basename(path)
+        if base.endswith('-chart.csv') or base.startswith('SLS-') or base == 'result.csv':
+            continue
+        product = _product(path)
+        if os.path.exists(product['chart']):
+            products.append(product)
+    return products
+
+
+def products_from_table(path):
+    """ CSV-taulukko, jonka otsikkorivillä test, chart ja valinnaisesti sls; polut suhteessa taulukkoon. """
+    folder = os.path.dirname(os.path.abspath(path))
+    products = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            resolve = lambda name: os.path.join(folder, row[name]) if row.get(name) else None
+            products.append(_product(resolve('test'), resolve('chart'), resolve('sls')))
+    return products
+
+
+def products_from_result(path='./TempFiles/result.csv'):
+    """ result.csv:n kaikki rivit: toinen sarake on testitiedoston nimi samassa kansiossa. """
+    folder = os.path.dirname(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        return [_product(os.path.join(folder, row[1].strip() + '.csv'))
+                for row in csv.reader(f) if len(row) >= 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many datasheets in one process.")
+    parser.add_argument("test_files", nargs="*", help="Test CSV files (<name>.csv with <name>-chart.csv)")
+    parser.add_argument("--products", metavar="TABLE", help="CSV table with columns test, chart[, sls]")
+    parser.add_argument("--result", metavar="FILE", help="Use every row of result.csv")
+    parser.add_argument("--sls", action="store_true", help="Render SLS datasheets (datasheetSLS layout)")
+    parser.add_argument("--template", default="DatasheetPohja.pdf", help="Template PDF")
+    parser.add_argument("--out", default=".", help="Output directory")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes (0 = all cores); output names are checked first")
+    parser.add_argument("--catalogue", metavar="FILE",
+                        help="Write all datasheets into one multi-page PDF instead of one file each")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Render only datasheets whose inputs changed since the last run (build manifest)")
+    parser.add_argument("--manifest", metavar="FILE", help="Build manifest path (default: in the output folder)")
+    args = parser.parse_args()
+
+    products = products_from_files([p for pattern in args.test_files for p in glob.glob(pattern) or [pattern]])
+    if args.products:
+        products += products_from_table(args.products)
+    if args.result:
+        products += products_from_result(args.result)
+    if not products:
+        parser.error("no products found")
+
+    start = time.perf_counter()
+    if args.incremental:
+        import datasheet_manifest
+        if args.catalogue:
+            rebuilt = datasheet_manifest.build_catalogue(products, args.catalogue, args.sls, args.template,
+                                                         args.manifest)
+            print(f"{args.catalogue}: {'kirjoitettu' if rebuilt else 'ennallaan'}, "
+                  f"{time.perf_counter() - start:.1f} s")
+            return
+        try:
+            paths, unchanged = datasheet_manifest.build(products, args.sls, args.template, args.out,
+                                                        args.workers or None, args.manifest)
+        except ValueError as exc:
+            parser.exit(1, f"{exc}\n")
+        print(f"{len(paths)} datalehteä piirretty, {unchanged} ennallaan, {time.perf_counter() - start:.1f} s")
+        return
+
+    if args.catalogue:
+        DatasheetRenderer(args.sls, args.template, args.out).render_catalogue(products, args.catalogue)
+        elapsed = time.perf_counter() - start
+        print(f"{args.catalogue}: {len(products)} sivua, {elapsed:.1f} s")
+        return
+
+    try:
+        paths = render_parallel(products, args.sls, args.template, args.out, args.workers or None)
+    except ValueError as exc:
+        parser.exit(1, f"{exc}\n")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} datalehteä, {elapsed:.1f} s ({elapsed / len(paths) * 1000:.0f} ms / datalehti)")
+
+
+if __name__ == "__main__":
+    main()
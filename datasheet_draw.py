@@ -0,0 +1,93 @@
+"""
+Datalehden piirtofunktiot, joita datasheet.py, datasheetSLS.py ja datasheet_batch.py käyttävät.
+
+Asettelumoduulit eroavat vain sisällöltään (page_content, STATIC_TEXTS) ja kuvaajan käyristä
+(draw_chart); tekstien, kuvien ja N–M-kuvaajan piirto canvakselle on kaikille sama.
+
+    chart = chart_form(datasheet.draw_chart, chart_data, variables)
+    draw_texts(c, texts)
+    draw_images(c, images)
+"""
+
+import io
+
+from font_service import configure_matplotlib
+
+
+def chart_form(draw_chart, chart_data, variables, figure=None):
+    """ N–M-kuvaaja vektorigrafiikkana: draw_chart(ax, chart_data, variables) piirtää käyrät,
+    matplotlibin PDF tehdään muistiin ja sen sivusta pdfrw-lomake (form XObject), joka piirretään
+    datalehteen draw_images-funktiolla. Annettu figure käytetään uudelleen. """
+    from matplotlib.figure import Figure
+    from pdfrw import PdfReader
+    from pdfrw.buildxobj import pagexobj
+
+    configure_matplotlib()
+    if figure is None:
+        figure = Figure(figsize=(10, 6))
+    else:
+        figure.clear()
+    draw_chart(figure.subplots(), chart_data, variables)
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='pdf')
+    buffer.seek(0)
+    return pagexobj(PdfReader(buffer).pages[0])
+
+
+def draw_images(c, images):
+    """ Piirtää kuvat canvakselle. Kuva on tiedostopolku tai ImageReader (rasteri) tai pdfrw-lomake
+    (vektori), joka skaalataan annettuun kokoon. Tiedostopolun kuva pienennetään ensin piirtokokoon
+    (image_cache), ja pääte löytyy kirjainkoosta riippumatta (4MT.PNG). """
+    from pdfrw.toreportlab import makerl
+    from image_cache import prepared_image
+
+    for image_info in images:
+        image = image_info['image']
+        x, y = image_info['x'], image_info['y']
+        width, height = image_info['width'], image_info['height']
+        if hasattr(image, 'BBox'):
+            x0, y0, x1, y1 = (float(v) for v in image.BBox)
+            c.saveState()
+            c.translate(x, y)
+            c.scale(width / (x1 - x0), height / (y1 - y0))
+            c.translate(-x0, -y0)
+            c.doForm(makerl(c, image))
+            c.restoreState()
+        else:
+            if isinstance(image, str):
+                image = prepared_image(image, width, height)
+            c.drawImage(image, x, y, width=width, height=height)
+
+
+def draw_texts(c, texts):
+    """ Piirtää tekstit canvakselle; "_{...}" piirretään alaindeksinä. """
+    for text_info in texts:
+        font_type = text_info.get('font', 'OpenSans-Regular')
+        font_size = text_info.get('size', 10)
+        c.setFont(font_type, font_size)
+
+        text = text_info['text']
+        if '_{' in text and '}' in text:  # Tarkistetaan, sisältääkö teksti alaindeksin
+            # Etsitään alaindeksin alku ja loppu
+            base_text, subscript_text = text.split('_{', 1)  # Jaa ensimmäisestä { merkistä
+            subscript_text = subscript_text.split('}', 1)[0]  # Poista }-merkki alaindeksistä
+
+            # Piirrä pääteksti
+            c.drawString(text_info['x'], text_info['y'], base_text)
+
+            # Pienennä fonttikokoa alaindeksille ja piirrä se
+            c.setFont("Helvetica", font_size - 2)  # Pienennetty fonttikoko alaindeksille
+            c.drawString(text_info['x'] + c.stringWidth(base_text, "Helvetica", font_size), text_info['y'], subscript_text)
+
+            # Palataan normaaliin fonttiin
+            c.setFont(font_type, font_size)
+
+            # Tulostetaan jäljellä oleva normaali teksti, jos sellaista on
+            remaining_text = text.split('}', 1)[1:]  # Jäljelle jäävä osa normaalina tekstinä
+            if remaining_text:
+                c.drawString(text_info['x'] + c.stringWidth(base_text + subscript_text, "Helvetica", font_size), text_info['y'], remaining_text[0])
+
+        else:
+            # Jos ei ole alaindeksiä, piirrä normaali teksti
+            c.drawString(text_info['x'], text_info['y'], text)
@@ -0,0 +1,167 @@
+"""
+Datalehtien koontiluettelo (manifest) ja inkrementaalinen uudelleenrakennus.
+
+Manifest tallentaa jokaiselle datalehdelle (PDF-tiedosto) sen syötteiden SHA-256-tiivisteet:
+    test, chart, sls    tuotteen testi-, käyrä- ja SLS-datatiedosto
+    image               tuotekuva (JatkosKuvat)
+    template            DatasheetPohja.pdf
+    font-regular/bold   OpenSans-fontit
+    layout, renderer    asettelumoduulin (datasheet.py / datasheetSLS.py) ja datasheet_batch.py:n koodi
+    drawing             tekstien, kuvien ja kuvaajan piirto (datasheet_draw.py)
+    image-cache         kuvien pienennys (image_cache.py)
+    font-service        fonttien käsittely ja pohjan karsinta (font_service.py)
+Datalehden avain on näiden tiivisteiden tiiviste. Uudelleenrakennuksessa piirretään vain datalehdet,
+joiden avain on muuttunut tai joiden PDF puuttuu; muut jätetään koskematta (niiden päivämäärä säilyy).
+
+Tiivisteet lasketaan sisällöstä, joten TempFiles-kansion tyhjentäminen ja saman sisällön kirjoittaminen
+uudelleen (RuotsiAjoULSSLS-DEL.py) ei aiheuta uudelleenpiirtoa. Tiedostoa ei lueta uudelleen, jos sen
+koko ja muutosaika ovat samat kuin manifestissa.
+
+Luettelo (--catalogue) on yksi tiedosto, joten se tehdään uudelleen kokonaan, jos jonkin sivun avain
+tai sivujen järjestys muuttuu.
+
+    python datasheet_batch.py --result ./TempFiles/result.csv --out ./Datalehdet --incremental
+"""
+
+import hashlib
+import json
+import os
+
+import datasheet_batch
+import datasheet_draw
+import font_service
+import image_cache
+from image_cache import resolve_image
+
+MANIFEST_NAME = 'datasheet-manifest.json'
+MANIFEST_VERSION = 1
+
+
+class FileHasher:
+    """ Tiedostojen SHA-256-tiivisteet; tunnetun tiedoston tiiviste käytetään, jos koko ja muutosaika täsmäävät. """
+
+    def __init__(self, known=None):
+        self.known = known or {}
+        self.used = {}
+
+    def digest(self, path):
+        """ Tiedoston tiiviste tai None, jos tiedostoa ei ole. """
+        path = os.path.abspath(path)
+        if path in self.used:
+            return self.used[path]['sha256']
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        record = self.known.get(path)
+        if not record or record['size'] != stat.st_size or record['mtime_ns'] != stat.st_mtime_ns:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            record = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        self.used[path] = record
+        return record['sha256']
+
+
+def product_inputs(module, product, template):
+    """ Datalehden nimi (ilman .pdf) ja sen syötetiedostot {rooli: polku}. """
+    variables, _, sls_variables = datasheet_batch.load_product(module, product)
+    args = (variables, sls_variables) if module.__name__ == 'datasheetSLS' else (variables,)
+    _, images, name = module.page_content(*args, chart_image=None, static=False)
+
+    inputs = {'test': product['test'], 'chart': product['chart']}
+    if product.get('sls'):
+        inputs['sls'] = product['sls']
+    inputs['image'] = resolve_image(next(info['image'] for info in images if isinstance(info['image'], str)))
+    inputs['template'] = template
+    inputs['font-regular'] = module.OPEN_SANS_REGULAR
+    inputs['font-bold'] = module.OPEN_SANS_BOLD
+    inputs['layout'] = module.__file__
+    inputs['renderer'] = datasheet_batch.__file__
+    inputs['drawing'] = datasheet_draw.__file__
+    inputs['image-cache'] = image_cache.__file__
+    inputs['font-service'] = font_service.__file__
+    return name, inputs
+
+
+def input_key(hashes):
+    """ Datalehden avain syötteiden tiivisteistä {rooli: tiiviste}. """
+    payload = json.dumps(sorted(hashes.items()))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'version': MANIFEST_VERSION, 'files': {}, 'datasheets': {}, 'catalogues': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'files': {}, 'datasheets': {}, 'catalogues': {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    # Kirjoitus ensin väliaikaistiedostoon, jotta keskeytynyt ajo ei jätä puolikasta manifestia
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def plan(products, sls=False, template='DatasheetPohja.pdf', out_dir='.', manifest=None):
+    """ Datalehtien tila: lista (tuote, PDF-tiedostonimi, avain, tiivisteet, muuttunut). """
+    manifest = manifest or load_manifest(os.path.join(out_dir, MANIFEST_NAME))
+    module = datasheet_batch.layout_module(sls)
+    hasher = FileHasher(manifest['files'])
+    entries = []
+    for product in products:
+        name, inputs = product_inputs(module, product, template)
+        hashes = {role: hasher.digest(path) for role, path in inputs.items()}
+        key = input_key(hashes)
+        file_name = f"{name}.pdf"
+        previous = manifest['datasheets'].get(file_name)
+        changed = (previous is None or previous['key'] != key
+                   or not os.path.exists(os.path.join(out_dir, file_name)))
+        entries.append((product, file_name, key, hashes, changed))
+    manifest['files'].update(hasher.used)
+    return entries
+
+
+def build(products, sls=False, template='DatasheetPohja.pdf', out_dir='.', workers=1, manifest_path=None):
+    """ Piirtää vain muuttuneet datalehdet (render_parallel) ja päivittää manifestin.
+    Palauttaa (piirretyt PDF-polut, ennallaan olevien määrä). """
+    manifest_path = manifest_path or os.path.join(out_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    datasheet_batch.check_output_names(products, sls)
+
+    entries = plan(products, sls, template, out_dir, manifest)
+    changed = [entry for entry in entries if entry[4]]
+    paths = []
+    if changed:
+        paths = datasheet_batch.render_parallel([entry[0] for entry in changed], sls, template, out_dir, workers)
+    for product, file_name, key, hashes, _ in changed:
+        manifest['datasheets'][file_name] = {'test': product['test'], 'key': key, 'inputs': hashes}
+    save_manifest(manifest, manifest_path)
+    return paths, len(entries) - len(changed)
+
+
+def build_catalogue(products, catalogue, sls=False, template='DatasheetPohja.pdf', manifest_path=None):
+    """ Tekee luettelon uudelleen vain, jos jonkin sivun avain tai sivujen järjestys on muuttunut.
+    Palauttaa True, jos luettelo kirjoitettiin. """
+    manifest_path = manifest_path or os.path.join(os.path.dirname(catalogue) or '.', MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    entries = plan(products, sls, template, os.path.dirname(catalogue) or '.', manifest)
+    key = input_key({str(number): entry[2] for number, entry in enumerate(entries)})
+
+    name = os.path.abspath(catalogue)
+    rebuilt = manifest['catalogues'].get(name) != key or not os.path.exists(catalogue)
+    if rebuilt:
+        datasheet_batch.DatasheetRenderer(sls, template).render_catalogue(products, catalogue)
+        manifest['catalogues'][name] = key
+    save_manifest(manifest, manifest_path)
+    return rebuilt
@@ -0,0 +1,124 @@
+"""
+EC2:n betonin ja teräksen materiaaliyhteydet NumPy-taulukoille.
+
+Kaavat ovat samat kuin EC2/Betonin_lujuus_ja_muodonmuutosominaisuudet.mcdx-laskentalehdessä
+(EC2 taulukko 3.1 ja kohdat 3.1.7, 3.2.7). Yksikkönä on MPa; venymät ovat laaduttomia.
+
+Lujuusluokan vakiot lasketaan kerran luokkaa kohden (concrete_class, lru_cache), joten niitä ei
+lasketa uudelleen silmukoissa. concrete_table kokoaa usean luokan vakiot taulukoiksi, joiden muoto on
+(luokat, 1, 1, ...), jolloin jännitysfunktiot laskevat kaikki luokat kerralla broadcastauksella:
+
+    table = concrete_table((30, 40, 60), ndim=2)
+    sigma = parabola_rectangle(eps, table.eps_c2, table.eps_cu2, fcd, table.n)   # eps (tilat, kuidut)
+    # sigma.shape == (3, tilat, kuidut); C60:lla n = 1,6
+    sigma = concrete_stress(eps, (30, 40, 60), fcd)                               # sama tulos
+
+Jännitysfunktiot:
+    parabola_rectangle   σc2: paraabeli-suorakaide, eksponentti n lujuusluokan mukaan (n = 2, kun
+                         fck ≤ 50); n voi olla luokittainen taulukko
+    bilinear_concrete    σc3: bilineaarinen
+    elastic_concrete     kimmoinen, veto 0 (käyttörajatila)
+    bilinear_steel       kimmoinen, myötölujuus rajana
+Betonin veto on 0 ja εcu:n ylitys antaa NaN kuten laskentalehdessä.
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+ConcreteClass = namedtuple("ConcreteClass", [
+    "fck", "fcm", "fctm", "fctk_005", "fctk_095", "Ecm",
+    "eps_c1", "eps_cu1", "eps_c2", "eps_cu2", "n", "eps_c3", "eps_cu3",
+])
+
+
+@lru_cache(maxsize=None)
+def concrete_class(fck):
+    """ Lujuusluokan vakiot, fck [MPa]. Ecm [MPa]. """
+    fck = float(fck)
+    fcm = fck + 8
+    fctm = 0.3 * fck ** (2 / 3) if fck <= 50 else 2.12 * math.log(1 + fcm / 10)
+    high = fck >= 50
+    return ConcreteClass(
+        fck=fck,
+        fcm=fcm,
+        fctm=fctm,
+        fctk_005=0.7 * fctm,
+        fctk_095=1.3 * fctm,
+        Ecm=22 * (fcm / 10) ** 0.3 * 1000,
+        eps_c1=min(0.7 * fcm ** 0.31, 2.8) / 1000,
+        eps_cu1=(2.8 + 27 * ((98 - fcm) / 100) ** 4) / 1000 if high else 0.0035,
+        eps_c2=(2 + 0.085 * (fck - 50) ** 0.53) / 1000 if high else 0.002,
+        eps_cu2=(2.6 + 35 * ((90 - fck) / 100) ** 4) / 1000 if high else 0.0035,
+        n=1.4 + 23.4 * ((90 - fck) / 100) ** 4 if high else 2.0,
+        eps_c3=(1.75 + 0.55 * (fck - 50) / 40) / 1000 if high else 0.00175,
+        eps_cu3=(2.6 + 35 * ((90 - fck) / 100) ** 4) / 1000 if high else 0.0035,
+    )
+
+
+@lru_cache(maxsize=64)
+def concrete_table(fck_values, ndim=0):
+    """ Usean luokan vakiot taulukkoina (ConcreteClass, kentät np.ndarray). fck_values on monikko.
+    Taulukoiden muoto on (luokat,) + (1,) * ndim, jotta ne broadcastautuvat ndim-ulotteisten
+    venymätaulukoiden kanssa. Palautettuja taulukoita ei saa muuttaa (välimuisti). """
+    classes = [concrete_class(fck) for fck in fck_values]
+    shape = (len(classes),) + (1,) * ndim
+    columns = {}
+    for field in ConcreteClass._fields:
+        column = np.array([getattr(c, field) for c in classes]).reshape(shape)
+        column.setflags(write=False)
+        columns[field] = column
+    return ConcreteClass(**columns)
+
+
+def design_strengths(fck, fyk, alpha_cc=1.0, gamma_c=1.5, gamma_s=1.15, myy_c=1.0, myy_p=1.0, myy_s=1.0):
+    """ (fck, fcd, fyd) laskentalehden tapaan: fck = fck μc μp, fcd = αcc fck / γc, fyd = fyk μs / γs.
+    Toimii sekä luvuille että taulukoille. """
+    fck = fck * myy_c * myy_p
+    return fck, alpha_cc * fck / gamma_c, fyk * myy_s / gamma_s
+
+
+def concrete_strain_limits(fck, model=2):
+    """ (εc, εcu) mallille 2 (paraabeli-suorakaide) tai 3 (bilineaarinen). """
+    c = concrete_class(fck)
+    return (c.eps_c2, c.eps_cu2) if model == 2 else (c.eps_c3, c.eps_cu3)
+
+
+def parabola_rectangle(eps, eps_c2, eps_cu2, fcd, n=2.0):
+    """ σc2: fcd (1 - (1 - ε/εc2)^n) kun 0 <= ε <= εc2, fcd kun ε <= εcu2. n lasketaan alkioittain,
+    joten se voi olla luku tai concrete_table-taulukko. """
+    eps = np.asarray(eps, dtype=float)
+    ratio = np.minimum(np.maximum(eps, 0.0) / eps_c2, 1.0)
+    sigma = fcd * np.where(ratio >= 1.0, 1.0, 1.0 - (1.0 - ratio) ** n)
+    return np.where(eps > eps_cu2, np.nan, sigma)
+
+
+def bilinear_concrete(eps, eps_c3, eps_cu3, fcd):
+    """ σc3: fcd ε / εc3 kun 0 <= ε <= εc3, fcd kun ε <= εcu3. """
+    eps = np.asarray(eps, dtype=float)
+    sigma = fcd * np.minimum(np.maximum(eps, 0.0) / eps_c3, 1.0)
+    return np.where(eps > eps_cu3, np.nan, sigma)
+
+
+def concrete_stress(eps, fck, fcd, model=2):
+    """ Laskentalehden σc: malli 2 tai 3 lujuusluokan fck vakioilla (myös eksponentti n).
+    Kun fck on jono luokkia, tulos lasketaan kaikille kerralla: muoto (luokat,) + eps.shape. """
+    if np.ndim(fck) == 0:
+        c = concrete_class(fck)
+    else:
+        c = concrete_table(tuple(float(v) for v in fck), ndim=np.ndim(eps))
+    if model == 2:
+        return parabola_rectangle(eps, c.eps_c2, c.eps_cu2, fcd, c.n)
+    return bilinear_concrete(eps, c.eps_c3, c.eps_cu3, fcd)
+
+
+def elastic_concrete(eps, e_eff):
+    """ Kimmoinen betoni ilman vetoa: max(ε Eeff, 0). """
+    return np.maximum(np.asarray(eps, dtype=float) * e_eff, 0.0)
+
+
+def bilinear_steel(eps, fyd, es=200000.0):
+    """ Teräs: Es ε, enintään ±fyd. """
+    return np.clip(es * np.asarray(eps, dtype=float), -fyd, fyd)
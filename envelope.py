@@ -0,0 +1,63 @@
+"""
+Usean N–M-käyrän sisäverhokäyrä NumPyllä.
+
+Käyrä on pari (x, y), esim. SLS-chart-SLS-*.csv:n rivit M ja N. Verhokäyrä lasketaan käyrien
+yhteisellä y-välillä kaikkien käyrien y-pisteissä (yksi lajittelu np.unique) ja lisäksi kohdissa,
+joissa kaksi käyrää leikkaavat, jolloin verhokäyrän taitekohdat ovat tarkkoja eivätkä riipu
+pisteväleistä. Jokaisessa pisteessä valitaan käyrä, jonka |x| on pienin (lähinnä N-akselia), ja
+palautetaan sen x etumerkkeineen.
+
+Käyrän x y:n funktiona lasketaan np.interp-funktiolla, joten käyrän y-arvojen pitää olla
+yksikäsitteisiä; toistuvista y-arvoista (esim. useita pisteitä x = 0) jätetään ensimmäinen.
+
+    x, y = inner_envelope([(m1, n1), (m2, n2), (m3, n3)])
+"""
+
+import numpy as np
+
+
+def _sorted_curve(x, y):
+    """ Käyrä y:n mukaan kasvavaan järjestykseen; toistuvista y-arvoista ensimmäinen. """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    y_sorted, first = np.unique(y, return_index=True)
+    return x[first], y_sorted
+
+
+def curves_at(curves, y):
+    """ Käyrien x-arvot korkeuksilla y: taulukko (käyrät, pisteet). """
+    return np.array([np.interp(y, cy, cx) for cx, cy in curves])
+
+
+def _crossings(curves, y):
+    """ Käyräparien |x|-leikkauskohdat peräkkäisten y-pisteiden väleissä (lineaarinen interpolointi). """
+    distance = np.abs(curves_at(curves, y))
+    first, second = np.triu_indices(len(curves), k=1)
+    diff = distance[first] - distance[second]
+    d0, d1 = diff[:, :-1], diff[:, 1:]
+    crossing = (d0 * d1 < 0)
+    pair, interval = np.nonzero(crossing)
+    t = d0[pair, interval] / (d0[pair, interval] - d1[pair, interval])
+    return y[interval] + t * (y[interval + 1] - y[interval])
+
+
+def inner_envelope(curves, y_range=None):
+    """ Sisäverhokäyrä (x, y) y:n mukaan laskevassa järjestyksessä.
+
+    curves on lista (x, y) -pareja. y_range = (alaraja, yläraja); oletuksena käyrien yhteinen y-väli. """
+    curves = [_sorted_curve(x, y) for x, y in curves]
+    if y_range is None:
+        y_range = (max(cy[0] for _, cy in curves), min(cy[-1] for _, cy in curves))
+    low, high = y_range
+    if low > high:
+        return np.empty(0), np.empty(0)
+
+    grid = np.unique(np.concatenate([cy for _, cy in curves] + [[low, high]]))
+    grid = grid[(grid >= low) & (grid <= high)]
+    if len(curves) > 1 and len(grid) > 1:
+        grid = np.union1d(grid, _crossings(curves, grid))
+
+    values = curves_at(curves, grid)
+    choice = np.abs(values).argmin(axis=0)
+    x = values[choice, np.arange(len(grid))]
+    return x[::-1], grid[::-1]
@@ -0,0 +1,104 @@
+"""
+Poikkileikkauksen kuituverkko ja jännitysten integrointi matriisitulona.
+
+Vastaa integraaliaala.mcdx:n pintaintegraalia: laskentalehti muodostaa monikulmion ylä- ja alareunan
+suorat (M_FunktBase) ja integroi jännityksen niiden välissä. Tässä monikulmio jaetaan kerran
+vaakakaistoiksi (kuiduiksi), koska venymä muuttuu vain y-suunnassa, ja tangot lisätään omina
+kuituinaan. Verkko riippuu vain geometriasta, joten se tallennetaan välimuistiin geometria-avaimella
+(monikulmio, tangot, kulma, kaistojen määrä). Saman geometrian käyrät eri materiaaleilla käyttävät
+samaa verkkoa.
+
+Venymätilojen joukko lasketaan kerralla:
+    ε = [ε_ala, ε_ylä] @ shape             (tilat, kuidut), shape on (2, kuidut)
+    [N, M] = σ(ε) @ weights                (tilat, 2), weights on (kuidut, 2) = [A, A y]
+Tankojen kohdalla betonin jännitys vähennetään (σs - tkb σc), joten tangon reikä otetaan huomioon.
+
+Materiaalifunktiot (ec2_materials) voivat palauttaa ylimääräisiä etuakseleita, esim. usean
+lujuusluokan kerralla concrete_table-taulukoilla; matriisitulo laskee ne samalla.
+
+    mesh = fiber_mesh(polygon, bars, alpha_deg=45.0)
+    n, m = mesh.forces(eps_bottom, eps_top, concrete, steel, tkb=1.0)
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+class FiberMesh:
+    """ Kierretty ja y-suunnassa keskitetty monikulmio kaistakuituina sekä tankokuidut. Yksikkö mm. """
+
+    def __init__(self, polygon, bars, alpha_deg=0.0, strips=2000):
+        # polygon [(x, y)], bars [(x, y, pinta-ala)]
+        angle = math.radians(alpha_deg)
+        rotation = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+        corners = np.asarray(polygon, dtype=float) @ rotation.T
+        bars = np.asarray(bars, dtype=float).reshape(-1, 3)
+        bar_xy = bars[:, :2] @ rotation.T
+
+        y_move = (corners[:, 1].max() + corners[:, 1].min()) / 2
+        self.corners = corners - [0.0, y_move]
+        self.bar_y = bar_xy[:, 1] - y_move
+        self.bar_area = bars[:, 2]
+        self.y_min = self.corners[:, 1].min()
+        self.y_max = self.corners[:, 1].max()
+        self.strips = strips
+
+        # Kaistojen keskipisteet ja pinta-alat (leveys keskipisteen korkeudella)
+        height = (self.y_max - self.y_min) / strips
+        self.strip_y = self.y_min + height * (np.arange(strips) + 0.5)
+        self.strip_area = self._width(self.strip_y) * height
+
+        # Kuidut: ensin kaistat, sitten tangot
+        y = np.concatenate([self.strip_y, self.bar_y])
+        area = np.concatenate([self.strip_area, self.bar_area])
+        t = (y - self.y_min) / (self.y_max - self.y_min)
+        self.shape = np.vstack([1.0 - t, t])
+        self.weights = np.column_stack([area, area * y])
+        for array in (self.corners, self.bar_y, self.bar_area, self.strip_y, self.strip_area,
+                      self.shape, self.weights):
+            array.setflags(write=False)
+
+    def _width(self, y):
+        """ Kuperan monikulmion leveys korkeudella y. """
+        start = self.corners
+        end = np.roll(self.corners, -1, axis=0)
+        dy = end[:, 1] - start[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (y[:, None] - start[:, 1]) / dy
+            x = start[:, 0] + t * (end[:, 0] - start[:, 0])
+        x = np.where((t >= 0) & (t <= 1) & (dy != 0), x, np.nan)
+        return np.nan_to_num(np.nanmax(x, axis=1) - np.nanmin(x, axis=1))
+
+    def strains(self, eps_bottom, eps_top):
+        """ Kuitujen venymät (tilat, kuidut): alareunassa eps_bottom, yläreunassa eps_top. """
+        states = np.column_stack([np.ravel(eps_bottom), np.ravel(eps_top)]).astype(float)
+        return states @ self.shape
+
+    def forces(self, eps_bottom, eps_top, concrete, steel, tkb=1.0):
+        """ N [kN] ja M = Σ σ A y [kNm] venymätiloille; concrete ja steel ovat funktioita σ(ε). """
+        eps = self.strains(eps_bottom, eps_top)
+        sigma = np.array(concrete(eps), dtype=float)
+        bars = slice(self.strips, None)
+        sigma[..., bars] = steel(eps[:, bars]) - tkb * sigma[..., bars]
+        nm = sigma @ self.weights
+        return nm[..., 0] / 1e3, nm[..., 1] / 1e6
+
+
+def geometry_key(polygon, bars, alpha_deg=0.0, strips=2000):
+    """ Välimuistiavain: koordinaatit pyöristettyinä, jotta liukulukujen pienet erot eivät luo uutta verkkoa. """
+    return (tuple((round(float(x), 9), round(float(y), 9)) for x, y in polygon),
+            tuple(tuple(round(float(v), 9) for v in bar) for bar in bars),
+            round(float(alpha_deg), 9), int(strips))
+
+
+@lru_cache(maxsize=256)
+def _cached_mesh(key):
+    polygon, bars, alpha_deg, strips = key
+    return FiberMesh(polygon, bars, alpha_deg, strips)
+
+
+def fiber_mesh(polygon, bars, alpha_deg=0.0, strips=2000):
+    """ Geometrian kuituverkko välimuistista (luodaan ensimmäisellä kutsulla). Verkkoa ei saa muuttaa. """
+    return _cached_mesh(geometry_key(polygon, bars, alpha_deg, strips))
@@ -0,0 +1,271 @@
+"""
+Datalehtien fontit yhdestä paikasta.
+
+    register_reportlab_fonts   OpenSans-Regular ja -Bold reportlabiin kerran prosessissa. reportlab
+                               upottaa niistä vain dokumentissa käytetyt merkit (osajoukko).
+    configure_matplotlib       sama OpenSans matplotlibin oletusfontiksi kerran prosessissa; PDF-kuvaajaan
+                               upotetaan vain kuvaajassa käytetyt merkit (Type 3 -fontti).
+    compact_template           DatasheetPohja.pdf, jonka upotetut fontit on karsittu sivulla käytettyihin
+                               merkkeihin ja samat fonttitiedostot yhdistetty; tulos levyvälimuistissa
+    share_glyph_procs          luettelossa kuvaajien samat merkit (Type 3 CharProcs) yhdeksi objektiksi
+
+Pohja on Wordista tallennettu PDF, johon on upotettu OpenSans- ja Calibri-fontit kokonaisina (noin
+260 kt kukin, OpenSansRoman-Bold kahdesti), vaikka sivulla käytetään muutamaa kymmentä merkkiä. Ne
+ovat suurin osa jokaisen datalehden koosta. compact_template lukee sivun sisältövirrasta, mitä merkkejä
+kullakin fontilla näytetään, ja karsii fonttitiedostot fontToolsilla (glyph-numerot säilyvät, joten
+Identity-H-fontit toimivat ennallaan). Tulos tallennetaan kansioon .font_cache pohjan SHA-256-tiivisteen
+mukaan, joten karsinta tehdään kerran pohjaa kohden eikä jokaisessa ajossa. Fontti, jota ei osata
+käsitellä turvallisesti (symbolifontti, oma Differences-koodaus, fontTools-virhe), jätetään ennalleen.
+"""
+
+import hashlib
+import io
+import os
+import zlib
+
+FONT_DIR = './font'
+OPEN_SANS_REGULAR = os.path.join(FONT_DIR, 'OpenSans-Regular.ttf')
+OPEN_SANS_BOLD = os.path.join(FONT_DIR, 'OpenSans-Bold.ttf')
+
+# Kasvatetaan, kun karsinnan logiikka muuttuu; vanhat välimuistitiedostot jäävät käyttämättä
+TEMPLATE_CACHE_VERSION = 1
+
+_reportlab_registered = False
+_matplotlib_configured = False
+
+
+def register_reportlab_fonts():
+    """ Rekisteröi OpenSans-fontit reportlabiin kerran prosessissa. """
+    global _reportlab_registered
+    if _reportlab_registered:
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if os.path.exists(OPEN_SANS_REGULAR):
+        pdfmetrics.registerFont(TTFont('OpenSans-Regular', OPEN_SANS_REGULAR))
+    if os.path.exists(OPEN_SANS_BOLD):
+        pdfmetrics.registerFont(TTFont('OpenSans-Bold', OPEN_SANS_BOLD))
+    _reportlab_registered = True
+
+
+def configure_matplotlib():
+    """ Asettaa Open Sansin matplotlibin oletusfontiksi kerran prosessissa. """
+    global _matplotlib_configured
+    if _matplotlib_configured:
+        return
+    from matplotlib import rcParams, font_manager
+
+    if os.path.exists(OPEN_SANS_REGULAR):
+        # Fontti lisätään matplotlibin fonttilistaan, muuten perhettä etsitään turhaan joka tekstille
+        font_manager.fontManager.addfont(OPEN_SANS_REGULAR)
+        prop = font_manager.FontProperties(fname=OPEN_SANS_REGULAR)
+        rcParams['font.family'] = prop.get_name()
+    else:
+        print("Open Sans Regular -fonttia ei löydy kansiosta. Käytetään oletusfonttia.")
+    # Type 3: kuvaajaan upotetaan vain käytetyt merkit
+    rcParams['pdf.fonttype'] = 3
+    _matplotlib_configured = True
+
+
+def _stream_bytes(stream):
+    """ PDF-virran sisältö tavuina (FlateDecode purettuna); None, jos suodatinta ei tueta. """
+    data = stream.stream.encode('latin-1')
+    if stream.Filter is None:
+        return data
+    if stream.Filter == '/FlateDecode' and stream.DecodeParms is None:
+        return zlib.decompress(data)
+    return None
+
+
+def _page_contents(page):
+    contents = page.Contents
+    streams = contents if isinstance(contents, list) else [contents]
+    data = [_stream_bytes(stream) for stream in streams]
+    return None if any(part is None for part in data) else b'\n'.join(data)
+
+
+def _shown_strings(content):
+    """ {fonttiresurssin nimi: [näytetyt merkkijonot tavuina]} sivun sisältövirrasta (Tf, Tj, ', ", TJ). """
+    from pdfrw import PdfTokens
+    from pdfrw.objects import PdfString
+    from pdfrw.objects.pdfname import BasePdfName
+
+    shown = {}
+    font = None
+    operands = []
+    for token in PdfTokens(content.decode('latin-1')):
+        if isinstance(token, PdfString):
+            operands.append(token.to_bytes())
+        elif isinstance(token, BasePdfName):
+            operands.append(token)
+        elif token == 'Tf':
+            font = next((op for op in reversed(operands) if isinstance(op, BasePdfName)), font)
+            operands = []
+        elif token in ('Tj', "'", '"', 'TJ'):
+            shown.setdefault(font, []).extend(op for op in operands if isinstance(op, bytes))
+            operands = []
+        elif token in ('BI', 'ID'):
+            # Sisäkuvan binääridataa ei voi jäsentää luotettavasti
+            raise ValueError("inline image in page content")
+        elif token not in ('[', ']'):
+            if token[:1].isalpha() or token[:1] in ("'", '"'):
+                operands = []
+    return shown
+
+
+def _font_file(font):
+    """ (fonttikuvaaja, FontFile2-virta, tapa) tai None, jos fonttia ei karsita. Tapa on 'gid' (Identity-H)
+    tai 'unicode' (WinAnsi-koodattu TrueType). """
+    if font.Subtype == '/Type0':
+        cid_font = font.DescendantFonts[0] if font.DescendantFonts else None
+        if (font.Encoding != '/Identity-H' or cid_font is None or cid_font.Subtype != '/CIDFontType2'
+                or cid_font.CIDToGIDMap not in (None, '/Identity')):
+            return None
+        descriptor, kind = cid_font.FontDescriptor, 'gid'
+    elif font.Subtype == '/TrueType':
+        if font.Encoding not in (None, '/WinAnsiEncoding'):
+            return None
+        descriptor, kind = font.FontDescriptor, 'unicode'
+        # Symbolifontin merkit haetaan (3,0)-cmapista, jota ei karsita
+        if descriptor is not None and int(descriptor.Flags or 0) & 4:
+            return None
+    else:
+        return None
+    if descriptor is None or descriptor.FontFile2 is None:
+        return None
+    return descriptor, descriptor.FontFile2, kind
+
+
+def _subset_font(data, gids, unicodes):
+    """ TrueType-fontti karsittuna annettuihin glyph-numeroihin ja Unicode-merkkeihin; numerot säilyvät. """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.retain_gids = True
+    options.notdef_outline = True
+    options.name_IDs = ['*']
+    options.name_languages = ['*']
+    options.name_legacy = True
+    options.layout_features = []
+    # Metatietotaulua fontTools ei osaa karsia; PDF ei tarvitse sitä
+    options.drop_tables += ['meta']
+    font = TTFont(io.BytesIO(data))
+    cmap = font.getBestCmap() or {}
+    missing = [char for char in unicodes if char not in cmap]
+    if missing:
+        # Merkki haetaan muuta reittiä kuin Unicode-cmapista; karsinta voisi hävittää sen
+        raise ValueError(f"no cmap entry for {''.join(map(chr, missing[:10]))!r}")
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(gids=sorted(gids), unicodes=sorted(unicodes))
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.save(output)
+    return output.getvalue()
+
+
+def compact_page_fonts(page):
+    """ Karsii sivun fonttien FontFile2-tiedostot sivulla käytettyihin merkkeihin paikallaan (pdfrw-sivu).
+    Sisällöltään samat fonttitiedostot karsitaan kerran yhdistetyllä merkistöllä ja jaetaan.
+    Palauttaa karsittujen tiedostojen määrän. """
+    from pdfrw import PdfName
+
+    content = _page_contents(page)
+    fonts = page.Resources.Font if page.Resources is not None else None
+    if content is None or not fonts:
+        return 0
+    shown = _shown_strings(content)
+
+    # Lomakkeiden (XObject) omia fontteja ei käsitellä; niiden tiedostoihin ei kosketa
+    protected = set()
+    for xobject in (page.Resources.XObject or {}).values():
+        for font in ((xobject.Resources or {}).get('/Font') or {}).values():
+            found = _font_file(font)
+            if found:
+                protected.add(id(found[1]))
+
+    groups = {}
+    for name, font in fonts.items():
+        found = _font_file(font)
+        if not found or id(found[1]) in protected:
+            continue
+        descriptor, stream, kind = found
+        data = _stream_bytes(stream)
+        if data is None:
+            continue
+        group = groups.setdefault(hashlib.sha256(data).hexdigest(),
+                                  {'data': data, 'descriptors': [], 'gids': {0}, 'unicodes': set()})
+        group['descriptors'].append(descriptor)
+        for text in shown.get(name, []):
+            if kind == 'gid':
+                group['gids'].update(int.from_bytes(text[i:i + 2], 'big') for i in range(0, len(text) - 1, 2))
+            else:
+                group['unicodes'].update(ord(char) for char in text.decode('cp1252', errors='ignore'))
+        if kind == 'unicode':
+            # Välilyönti on mukana aina; Word määrittelee sen useimmille fonteille (FirstChar 32)
+            group['unicodes'].add(0x20)
+
+    compacted = 0
+    for group in groups.values():
+        try:
+            data = _subset_font(group['data'], group['gids'], group['unicodes'])
+        except Exception as exc:
+            print(f"Fonttia ei karsittu ({group['descriptors'][0].FontName}): {exc!r}")
+            continue
+        stream = group['descriptors'][0].FontFile2
+        stream.stream = zlib.compress(data, 9).decode('latin-1')
+        stream.Filter = PdfName.FlateDecode
+        stream.DecodeParms = None
+        stream.Length1 = len(data)
+        for descriptor in group['descriptors']:
+            descriptor.FontFile2 = stream
+        compacted += 1
+    return compacted
+
+
+def compact_template(template='DatasheetPohja.pdf', cache_dir='.font_cache'):
+    """ Polku pohjaan, jonka ensimmäisen sivun fontit on karsittu (compact_page_fonts). Tulos tehdään
+    kerran ja luetaan sen jälkeen välimuistista. Ilman fontToolsia palautetaan alkuperäinen pohja. """
+    try:
+        import fontTools  # noqa: F401  (matplotlibin riippuvuus)
+    except ImportError:
+        return template
+
+    digest = hashlib.sha256()
+    with open(template, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    cached = os.path.join(cache_dir, f"{digest.hexdigest()[:32]}-v{TEMPLATE_CACHE_VERSION}.pdf")
+    if os.path.exists(cached):
+        return cached
+
+    from pdfrw import PdfReader, PdfWriter
+
+    reader = PdfReader(template)
+    try:
+        compact_page_fonts(reader.pages[0])
+    except ValueError as exc:
+        print(f"Pohjan fontteja ei karsittu: {exc}")
+        return template
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Kirjoitus ensin väliaikaistiedostoon, jotta rinnakkaiset prosessit eivät näe puolikasta pohjaa
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    PdfWriter(tmp_path, trailer=reader, compress=True).write()
+    os.replace(tmp_path, cached)
+    return cached
+
+
+def share_glyph_procs(form, shared):
+    """ Korvaa kuvaajalomakkeen Type 3 -fonttien merkkiproseduurit (CharProcs) sisällöltään samoilla
+    objekteilla sanakirjasta shared. Saman dokumentin lomakkeet viittaavat silloin samoihin objekteihin,
+    ja pdfrw.toreportlab.makerl kirjoittaa ne luetteloon kerran. """
+    fonts = (form.Resources or {}).get('/Font') or {}
+    for font in fonts.values():
+        if font.Subtype != '/Type3' or font.CharProcs is None:
+            continue
+        for name, proc in list(font.CharProcs.items()):
+            key = (name, proc.stream, proc.Filter)
+            font.CharProcs[name] = shared.setdefault(key, proc)
+    return form
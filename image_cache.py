@@ -0,0 +1,106 @@
+"""
+Tuotekuvien (JatkosKuvat) esikäsittely ja levyvälimuisti.
+
+Datalehti piirtää tuotekuvan 220 × 220 pt kokoon, mutta lähdekuvat ovat täyskokoisia (esim.
+1200 × 900 px). prepared_image purkaa kuvan kerran, pienentää sen piirtokoon ja tulostustarkkuuden
+(oletuksena 300 dpi) mukaiseksi ja tallentaa tuloksen välimuistiin RGB-PNG-muodossa, jonka reportlab
+upottaa sellaisenaan. Avain on lähdetiedoston SHA-256 sekä kohdekoko pikseleinä, joten kuvan
+vaihtaminen tai piirtokoon muutos luo uuden merkinnän. Kuvaa ei koskaan suurenneta.
+
+Kuvan nimi tulee testitiedoston Kuva-kentästä ja polku muodostetaan muodossa
+./JatkosKuvat/<Kuva>.png. Kansiossa on myös isolla kirjoitettuja päätteitä (4MT.PNG, 8MT.PNG), jotka
+Windows löytää mutta Linux ei; resolve_image etsii tiedoston kirjainkoosta riippumatta.
+
+    path = prepared_image('./JatkosKuvat/4MT.png', 220, 220)
+"""
+
+import hashlib
+import math
+import os
+
+DEFAULT_DPI = 300
+
+
+def resolve_image(path):
+    """ Olemassa oleva tiedosto, jonka nimi vastaa polkua kirjainkoosta riippumatta; muuten polku sellaisenaan. """
+    if os.path.exists(path):
+        return path
+    folder, name = os.path.split(path)
+    try:
+        for candidate in os.listdir(folder or '.'):
+            if candidate.casefold() == name.casefold():
+                return os.path.join(folder, candidate)
+    except FileNotFoundError:
+        pass
+    return path
+
+
+class ImageCache:
+    """ Pienennetyt tuotekuvat levyllä ja prosessin muistissa. """
+
+    def __init__(self, cache_dir=".image_cache", dpi=DEFAULT_DPI):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self._hashes = {}
+        self._prepared = {}
+
+    def source_hash(self, path):
+        """ Lähdekuvan sisällön tiiviste; luetaan uudelleen vain jos tiedosto on muuttunut. """
+        stat = os.stat(path)
+        stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if stamp not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._hashes[stamp] = digest.hexdigest()
+        return self._hashes[stamp]
+
+    def target_size(self, width, height):
+        """ Piirtokoko (pt) pikseleinä tulostustarkkuudella. """
+        return math.ceil(width / 72 * self.dpi), math.ceil(height / 72 * self.dpi)
+
+    def prepared(self, path, width, height):
+        """ Polku kuvaan, joka on pienennetty piirtokokoon width × height pt. """
+        path = resolve_image(path)
+        size = self.target_size(width, height)
+        memo = (path, size)
+        if memo in self._prepared:
+            return self._prepared[memo]
+
+        key = f"{self.source_hash(path)[:32]}-{size[0]}x{size[1]}"
+        cached = os.path.join(self.cache_dir, key + '.png')
+        if not os.path.exists(cached):
+            self._write(path, size, cached)
+        self._prepared[memo] = cached
+        return cached
+
+    def _write(self, path, size, cached):
+        from PIL import Image
+
+        with Image.open(path) as image:
+            image.load()
+            # Läpinäkyvyys vain jos sitä oikeasti käytetään; muuten reportlab lisäisi turhan SMaskin
+            has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+            if has_alpha and image.getchannel('A').getextrema()[0] == 255:
+                image = image.convert('RGB')
+            # thumbnail säilyttää kuvasuhteen eikä suurenna; drawImage venyttää kuvan annettuun kokoon kuten ennenkin
+            image.thumbnail(size, Image.LANCZOS)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Kirjoitus ensin väliaikaistiedostoon, jotta rinnakkaiset prosessit eivät näe puolikasta kuvaa
+            tmp_path = f"{cached}.{os.getpid()}.tmp"
+            image.save(tmp_path, format='PNG', optimize=True)
+        os.replace(tmp_path, cached)
+
+
+_default_cache = None
+
+
+def prepared_image(path, width, height):
+    """ Kuva pienennettynä piirtokokoon oletusvälimuistista (.image_cache, DEFAULT_DPI). """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ImageCache()
+    return _default_cache.prepared(path, width, height)
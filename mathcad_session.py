@@ -0,0 +1,129 @@
+"""
+Mathcad Prime -istuntojen pooli.
+
+Mathcad Primen käynnistys (Dispatch) ja laskentalehden avaus (Open) kestävät
+moninkertaisesti itse laskentaan verrattuna. Pooli pitää sovelluksen ja avatun
+laskentalehden lämpimänä ja kierrättää istunnon vasta, kun sillä on tehty
+'recycle_after' laskentaa tai kun Mathcad on kaatunut kesken laskennan
+(vrt. traceback.log: CRASH, exception e0434352).
+
+Esimerkki:
+    pool = MathcadSessionPool(visible=False, recycle_after=10)
+    session = pool.acquire(worksheet_path)
+    try:
+        session.worksheet.SetRealValue(session.first_input, 5, "")
+        pool.release(session)
+    except Exception:
+        pool.release(session, failed=True)
+    pool.close_all()
+"""
+
+from win32com.client import Dispatch
+
+from stage_timing import stage
+
+
+class MathcadSession:
+    """ Yksi käynnissä oleva Mathcad Prime ja siihen avattu laskentalehti. """
+
+    def __init__(self, worksheet_path, visible=False):
+        self.worksheet_path = worksheet_path
+        self.evaluations = 0
+        # Viimeksi asetetut syötteet; vain muuttuneet asetetaan uudelleen
+        self.current_inputs = {}
+
+        # Käynnistä Mathcad Prime
+        with stage("dispatch"):
+            self.mathcad = Dispatch("MathcadPrime.Application")
+            self.mathcad.Visible = visible
+            self.mathcad.Activate()
+
+        with stage("open", worksheet=worksheet_path):
+            # Avaa laskentalehti
+            self.worksheet = self.mathcad.Open(worksheet_path)
+            if not self.worksheet:
+                self.close()
+                raise RuntimeError(f"Failed to open file: {worksheet_path}")
+
+            self.worksheet.SetTitle("Title from Python Script")
+
+            # Syötteiden ja tulosten aliakset haetaan kerran istuntoa kohden
+            self.inputs = self.worksheet.Inputs
+            self.first_input = self.inputs.GetAliasByIndex(0)
+            outputs = self.worksheet.Outputs
+            self.output_aliases = [outputs.GetAliasByIndex(i) for i in range(outputs.Count)]
+
+    def set_inputs(self, inputs):
+        """ Asettaa syötteet {alias: arvo}, mutta vain ne joiden arvo on muuttunut. Palauttaa asetetut aliakset. """
+        changed = [alias for alias, value in inputs.items() if self.current_inputs.get(alias) != value]
+        # Usean syötteen muutos lasketaan kerralla, jos Mathcad-versio tukee laskennan keskeytystä
+        pause = len(changed) > 1 and hasattr(self.worksheet, "PauseCalculation")
+        with stage("set_inputs", changed=len(changed)):
+            if pause:
+                self.worksheet.PauseCalculation()
+            try:
+                for alias in changed:
+                    self.worksheet.SetRealValue(alias, inputs[alias], "")
+                    self.current_inputs[alias] = inputs[alias]
+            finally:
+                if pause:
+                    self.worksheet.ResumeCalculation()
+        return changed
+
+    def read_outputs(self):
+        """ Lukee kaikki tulokset: {alias: (RealResult, Units)}. Tyhjät tulokset ohitetaan. """
+        results = {}
+        with stage("read_outputs"):
+            for alias in self.output_aliases:
+                val = self.worksheet.OutputGetRealValue(alias)
+                if val:
+                    results[alias] = (val.RealResult, val.Units)
+        return results
+
+    def close(self):
+        """ Sulkee laskentalehden ja Mathcadin. Kaatuneen istunnon virheet ohitetaan. """
+        try:
+            self.mathcad.CloseAll(0)
+            self.mathcad.Quit(2)
+        except Exception:
+            pass
+
+
+class MathcadSessionPool:
+    """ Pitää yhden lämpimän istunnon laskentalehteä kohden ja kierrättää sen tarvittaessa. """
+
+    def __init__(self, visible=False, recycle_after=10, on_message=print):
+        # recycle_after <= 0 tarkoittaa, ettei istuntoa kierrätetä laskentojen määrän perusteella
+        self.visible = visible
+        self.recycle_after = recycle_after
+        self.on_message = on_message
+        self._sessions = {}
+
+    def acquire(self, worksheet_path):
+        """ Palauttaa lämpimän istunnon tai käynnistää uuden, jos sellaista ei ole. """
+        session = self._sessions.get(worksheet_path)
+        if session is None:
+            self.on_message(f"Starting Mathcad Prime for {worksheet_path}")
+            session = MathcadSession(worksheet_path, self.visible)
+            self._sessions[worksheet_path] = session
+        return session
+
+    def release(self, session, failed=False):
+        """ Palauttaa istunnon pooliin; kierrättää sen virheen tai N laskennan jälkeen. """
+        session.evaluations += 1
+        if failed:
+            self.on_message("Mathcad session failed, restarting Mathcad Prime...")
+            self.recycle(session)
+        elif self.recycle_after > 0 and session.evaluations >= self.recycle_after:
+            self.on_message(f"Recycling Mathcad session after {session.evaluations} evaluations")
+            self.recycle(session)
+
+    def recycle(self, session):
+        """ Sulkee istunnon; seuraava acquire käynnistää uuden. """
+        if self._sessions.get(session.worksheet_path) is session:
+            del self._sessions[session.worksheet_path]
+        session.close()
+
+    def close_all(self):
+        for session in list(self._sessions.values()):
+            self.recycle(session)
@@ -0,0 +1,471 @@
+"""
+Mathcad Prime -laskentasarjan ajo ilman käyttöliittymää.
+
+Sama ajo kuin ApiAjoMuuGui.py:ssä (laskentalehti, aloitus- ja lopetusarvo, näkyvyys ja
+jälkikäsittelyskripti), mutta ilman Tkinteria, jotta sarjoja voidaan ajaa komentoriviltä,
+ajastettuna tai valvomattomilla koneilla. Käyttöliittymät käyttävät samaa run_sweep-funktiota
+taustasäikeessä ja saavat etenemisen tapahtumina jonon kautta.
+
+Tapahtumat välitetään on_event-funktiolle pareina (laji, data):
+    ("message", teksti)
+    ("progress", prosentti 0..100)
+    ("result", (syötearvo, RealResult, Units))
+
+Jälkikäsittely kierroksittain:
+    Koukku on funktio hook(value, outputs), jossa outputs on sanakirja {alias: (RealResult, Units)}.
+    Koukun voi rekisteröidä register_hook-funktiolla tai antaa run_sweep-funktiolle hooks-listana.
+    Jos valitussa jälkikäsittelyskriptissä on funktio on_iteration(value, outputs), skripti tuodaan
+    moduulina kerran ajon alussa ja funktiota kutsutaan joka kierroksella. Muuten skripti ajetaan
+    runpy:llä kuten ennenkin.
+
+Laskentatausta ja rinnakkaisajo:
+    Laskenta tehdään sweep_backends-moduulin taustalla (oletuksena MathcadBackend). Kun workers > 1,
+    arvot jaetaan workers-prosessille, joista jokainen luo oman taustansa (oma Mathcad-istunto) kerran
+    ja pitää sen lämpimänä. Tulokset käsitellään ja koukut ajetaan pääprosessissa syötejärjestyksessä
+    heti, kun kukin arvo on valmis. Rinnakkaisajoa ei voi yhdistää jälkikäsittelyskriptiin tai
+    koukkuihin, koska kaikki istunnot kirjoittavat samoihin ./TempFiles-tiedostoihin (ValueError).
+    Kun cache_dir on annettu, tulokset haetaan ensin result_cache-välimuistista (CachedBackend);
+    cache_options ({"max_bytes", "max_age_days"}) rajaa välimuistin koon ja iän. Välimuistia ei voi
+    yhdistää jälkikäsittelyskriptiin tai koukkuihin, koska osumalla ./TempFiles-tiedostot eivät päivity.
+    Kun record_dir on annettu, kaikkien tulosten arvot tallennetaan sarakkeittain (sweep_store).
+    Kun journal_path on annettu, jokainen valmis arvo kirjataan heti päiväkirjaan (sweep_journal).
+    Kun timing on annettu (tiedostopolku), vaiheiden kestot mitataan (stage_timing), yhteenveto
+    lähetetään viestinä ja Chrome trace -tiedosto kirjoitetaan ajon lopuksi. Myös työprosessien
+    vaiheet kerätään samaan tiedostoon.
+    Jatkotilassa (resume=True) päiväkirjassa jo olevat arvot ohitetaan ja tausta käynnistetään vain
+    puuttuville arvoille. Olemassa oleva päiväkirja aloitetaan alusta vain, kun overwrite=True.
+
+Syötearvot:
+    Oletuksena arvot ovat start..end askeleella step (myös desimaaliluvut). Kun adaptive on annettu
+    (AdaptiveSampler-asetukset sanakirjana), aloitetaan harvasta hilasta ja tihennetään vain siellä,
+    missä tulos kaartuu tai muuttuu jyrkästi (adaptive_sweep). Adaptiivinen ajo lasketaan yhdessä
+    prosessissa, koska seuraavat arvot riippuvat edellisistä tuloksista. Palautettu lista on
+    syötearvojen mukaisessa järjestyksessä.
+    Kun grid on annettu (lista yhdistelmiä {alias: arvo}, ks. sweep_grid), start- ja end-arvoja ei
+    käytetä: toistuvat ja päiväkirjassa jo olevat yhdistelmät ohitetaan ja loput lasketaan
+    järjestyksessä, jossa peräkkäisten laskentojen välillä muuttuu mahdollisimman vähän syötteitä.
+    Rinnakkaisajossa kukin prosessi saa yhtenäisen jakson järjestetystä listasta.
+
+Esimerkki ajosta:
+    python mathcad_sweep.py "1-NM-Kuvaaja-Current.mcdx" 1 10 --script RuotsiAjoULSSLS.py
+    python mathcad_sweep.py results.txt 1 101 --replay --workers 4
+    python mathcad_sweep.py results.txt 1 101 --replay --adaptive --adaptive-output N --adaptive-output M
+    python mathcad_sweep.py "1-NM-Kuvaaja-Current.mcdx" --grid tuotteet.json --journal tuotteet.jsonl
+"""
+
+import argparse
+import ast
+import importlib.util
+import math
+import os
+import runpy
+import sys
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+
+import stage_timing
+from adaptive_sweep import AdaptiveSampler
+from result_cache import ResultCache
+from stage_timing import stage
+from sweep_backends import CachedBackend, MathcadBackend, ReplayBackend
+from sweep_grid import count_changes, load_spec, point_key, schedule
+from sweep_journal import SweepJournal
+from sweep_store import ColumnRecorder
+
+
+# Kaikissa ajoissa kutsuttavat koukut
+_hooks = []
+
+
+def register_hook(func):
+    """ Rekisteröi koukun func(value, outputs). Toimii myös dekoraattorina. """
+    _hooks.append(func)
+    return func
+
+
+def print_event(event):
+    """ Oletuskäsittelijä: tulostaa viestit komentoriville. """
+    kind, data = event
+    if kind == "message":
+        print(data)
+
+
+@contextmanager
+def script_directory(python_script_path):
+    """ Vaihtaa työkansioksi skriptin kansion, koska skriptit käyttävät ./TempFiles-polkuja. """
+    current_dir = os.getcwd()
+    try:
+        os.chdir(os.path.dirname(os.path.abspath(python_script_path)))
+        yield
+    finally:
+        os.chdir(current_dir)
+
+
+def run_script(python_script_path):
+    """ Ajaa jälkikäsittelyskriptin kokonaan uudelleen runpy:llä. """
+    with script_directory(python_script_path):
+        runpy.run_path(python_script_path, run_name="__main__")
+
+
+def defines_on_iteration(python_script_path):
+    """ Onko skriptissä moduulitason on_iteration-funktio. Skriptiä ei ajeta, vaan sen lähdekoodi jäsennetään. """
+    with open(python_script_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=python_script_path)
+    return any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "on_iteration"
+               for node in tree.body)
+
+
+def load_script_hook(python_script_path):
+    """ Tuo skriptin moduulina kerran ja palauttaa sen on_iteration-koukun, tai None jos sitä ei ole.
+    Skripti ilman on_iteration-funktiota jätetään tuomatta, koska tuonti ajaisi sen kerran ylimääräisenä. """
+    if not defines_on_iteration(python_script_path):
+        return None
+
+    script_dir = os.path.dirname(os.path.abspath(python_script_path))
+    module_name = os.path.splitext(os.path.basename(python_script_path))[0]
+
+    if module_name in sys.modules:
+        module = sys.modules[module_name]
+    else:
+        spec = importlib.util.spec_from_file_location(module_name, python_script_path)
+        module = importlib.util.module_from_spec(spec)
+        if script_dir not in sys.path:
+            sys.path.insert(0, script_dir)
+        with script_directory(python_script_path):
+            spec.loader.exec_module(module)
+        sys.modules[module_name] = module
+
+    on_iteration = getattr(module, "on_iteration", None)
+    if on_iteration is None:
+        return None
+
+    def hook(value, outputs):
+        with script_directory(python_script_path):
+            on_iteration(value, outputs)
+
+    hook.__qualname__ = f"{module_name}.on_iteration"
+    return hook
+
+
+def sweep_values(start_value, end_value, step=1):
+    """ Tasavälinen arvolista start..end päätepiste mukaan lukien; kokonaisluvut pysyvät kokonaislukuina. """
+    count = int(math.floor((end_value - start_value) / step + 1e-9)) + 1
+    return [start_value + i * step for i in range(max(count, 0))]
+
+
+def describe_value(value):
+    """ Syötearvo viestejä varten: luku sellaisenaan, yhdistelmä muodossa alias=arvo. """
+    if isinstance(value, dict):
+        return ", ".join(f"{alias}={v}" for alias, v in value.items())
+    return f"Input1 to {value}"
+
+
+def iter_local(backend_factory, values, on_message=print):
+    """ Laskee arvot yhdellä taustalla tässä prosessissa. """
+    if not values:
+        return
+    backend = backend_factory(on_message=on_message)
+    try:
+        for value in values:
+            on_message(f"Using SetRealValue to change {describe_value(value)}")
+            with stage("evaluate"):
+                outputs = backend.evaluate(value)
+            yield value, outputs
+    finally:
+        backend.close()
+
+
+def iter_adaptive(backend_factory, sampler, journal=None, on_message=print):
+    """ Laskee adaptiivisen näytteistyksen arvot. Päiväkirjassa jo olevia arvoja ei lasketa uudelleen. """
+    backend = None
+    try:
+        for value in sampler:
+            if journal and journal.is_done(value):
+                outputs, from_journal = journal.get(value), True
+            else:
+                # Tausta käynnistetään vasta ensimmäiselle laskettavalle arvolle
+                if backend is None:
+                    backend = backend_factory(on_message=on_message)
+                on_message(f"Using SetRealValue to change {describe_value(value)}")
+                with stage("evaluate"):
+                    outputs, from_journal = backend.evaluate(value), False
+            sampler.add(value, outputs)
+            yield value, outputs, from_journal
+    finally:
+        if backend is not None:
+            backend.close()
+
+
+# Rinnakkaisajon työprosessin oma tausta
+_worker_backend = None
+
+
+def _init_worker(backend_factory, timing=False):
+    """ Luo työprosessin taustan kerran; suljetaan kun prosessi päättyy. """
+    global _worker_backend
+    if timing:
+        stage_timing.enable()
+    _worker_backend = backend_factory()
+    Finalize(None, _worker_backend.close, exitpriority=10)
+
+
+def _evaluate_in_worker(value):
+    print(f"Using SetRealValue to change {describe_value(value)}")
+    with stage("evaluate"):
+        outputs = _worker_backend.evaluate(value)
+    # Työprosessin mittaukset palautetaan tuloksen mukana pääprosessin ajastimeen
+    timer = stage_timing.current()
+    return value, outputs, timer.drain() if timer else []
+
+
+def iter_sharded(backend_factory, values, workers, chunksize=1):
+    """ Jakaa arvot workers prosessille ja palauttaa tulokset syötejärjestyksessä. """
+    if not values:
+        return
+    timer = stage_timing.current()
+    pool = Pool(min(workers, len(values)), initializer=_init_worker, initargs=(backend_factory, timer is not None))
+    try:
+        # imap palauttaa tulokset järjestyksessä heti kun edeltävät ovat valmiita
+        for value, outputs, events in pool.imap(_evaluate_in_worker, values, chunksize):
+            if timer:
+                timer.extend(events)
+            yield value, outputs
+    finally:
+        # close + join (ei terminate), jotta työprosessit ehtivät sulkea Mathcadin
+        pool.close()
+        pool.join()
+
+
+def run_sweep(worksheet_path, start_value, end_value, visible=False, python_script_path=None,
+              recycle_after=0, on_event=print_event, hooks=None, backend_factory=None, workers=1,
+              cache_dir=None, record_dir=None, journal_path=None, resume=False, step=1, adaptive=None,
+              grid=None, timing=None, overwrite=False, cache_options=None):
+    """ Ajaa laskentalehden syötearvoilla start_value..end_value ja palauttaa listan (arvo, tulos, yksikkö). """
+
+    def msg(m):
+        on_event(("message", m))
+
+    # Jokainen työprosessin Mathcad-istunto kirjoittaa samat ./TempFiles-tiedostot, joita skriptit ja koukut
+    # lukevat, joten rinnakkaisajossa koukku voisi lukea toisen arvon tuloksen
+    if workers > 1 and (python_script_path or _hooks or hooks):
+        raise ValueError("workers > 1 cannot be combined with a post-script or iteration hooks")
+    # Välimuistiosumalla laskentalehti ei kirjoita ./TempFiles-tiedostoja, joten koukku lukisi edellisen arvon
+    if cache_dir and (python_script_path or _hooks or hooks):
+        raise ValueError("cache_dir cannot be combined with a post-script or iteration hooks")
+
+    if timing:
+        stage_timing.enable()
+
+    # Koukut ladataan kerran ajon alussa, jolloin skriptien tuonnit pysyvät lämpiminä
+    iteration_hooks = list(_hooks) + list(hooks or [])
+    run_script_each_time = False
+    if python_script_path:
+        try:
+            script_hook = load_script_hook(python_script_path)
+        except Exception as ex:
+            msg(f"Error in script: {ex}")
+            script_hook = None
+        if script_hook:
+            msg(f"Loaded on_iteration hook from {os.path.basename(python_script_path)}")
+            iteration_hooks.append(script_hook)
+        else:
+            run_script_each_time = True
+
+    if backend_factory is None:
+        backend_factory = partial(MathcadBackend, worksheet_path, visible=visible, recycle_after=recycle_after)
+    if cache_dir:
+        backend_factory = partial(CachedBackend, backend_factory, worksheet_path, cache_dir,
+                                  **(cache_options or {}))
+
+    journal = SweepJournal(journal_path, worksheet_path, resume=resume, overwrite=overwrite) if journal_path else None
+
+    if adaptive is not None:
+        if workers > 1:
+            msg("Adaptive sweep runs in a single process")
+        sampler = AdaptiveSampler(start_value, end_value, **adaptive)
+        evaluated = iter_adaptive(backend_factory, sampler, journal, on_message=msg)
+        total = sampler.max_points
+    else:
+        if grid is not None:
+            unique = {}
+            for point in grid:
+                unique.setdefault(point_key(point), point)
+            if len(unique) < len(grid):
+                msg(f"Skipped {len(grid) - len(unique)} duplicate input combinations")
+            # Järjestys tehdään vain puuttuville, ettei päiväkirjassa jo olevat riko sitä
+            done = {key for key, point in unique.items() if journal and journal.is_done(point)}
+            remaining = schedule(grid, done=done)
+            values = [point for key, point in unique.items() if key in done] + remaining
+        else:
+            values = sweep_values(start_value, end_value, step)
+            remaining = [value for value in values if not (journal and journal.is_done(value))]
+        total = len(values)
+        if len(remaining) < len(values):
+            msg(f"Resuming sweep: {len(values) - len(remaining)} values already in journal")
+        if grid is not None:
+            msg(f"Grid sweep: {len(remaining)} combinations, {count_changes(remaining)} input changes")
+
+        if workers > 1:
+            msg(f"Running {len(remaining)} values in {workers} worker processes")
+            # Yhdistelmät jaetaan yhtenäisinä jaksoina, jotta kunkin prosessin syötemuutokset pysyvät pieninä
+            chunksize = -(-len(remaining) // workers) if grid is not None else 1
+            computed = iter_sharded(backend_factory, remaining, workers, chunksize)
+        else:
+            computed = iter_local(backend_factory, remaining, on_message=msg)
+
+        def merge_journal():
+            # Päiväkirjan ja laskettujen arvojen yhdistys syötejärjestyksessä
+            try:
+                for value in values:
+                    if journal and journal.is_done(value):
+                        yield value, journal.get(value), True
+                    else:
+                        yield next(computed) + (False,)
+            finally:
+                computed.close()
+
+        evaluated = merge_journal()
+
+    results = []
+    recorder = ColumnRecorder() if record_dir else None
+
+    def handle_value(value, outputs, from_journal):
+        if recorder:
+            recorder.append(value, outputs)
+        if outputs:
+            first_output, (real_result, units) = next(iter(outputs.items()))
+            msg(f"For Input value {value}, Output1 = {real_result} {units}")
+            results.append((value, real_result, units))
+            on_event(("result", (value, real_result, units)))
+        else:
+            msg(f"No result for input {value}")
+
+        # Päiväkirjan arvoille jälkikäsittely on tehty jo edellisessä ajossa
+        if from_journal:
+            return
+        if journal and outputs:
+            journal.append(value, outputs)
+
+        for hook in iteration_hooks:
+            try:
+                with stage("hook", hook=getattr(hook, "__qualname__", hook)):
+                    hook(value, outputs)
+            except Exception as ex:
+                msg(f"Error in hook: {ex}")
+
+        # Skripti ilman on_iteration-koukkua ajetaan kokonaan joka kierroksella
+        if run_script_each_time:
+            msg(f"Running script: {os.path.basename(python_script_path)}")
+            try:
+                with stage("hook", hook=os.path.basename(python_script_path)):
+                    run_script(python_script_path)
+            except Exception as ex:
+                msg(f"Error in script: {ex}")
+
+    try:
+        for i, (value, outputs, from_journal) in enumerate(evaluated):
+            handle_value(value, outputs, from_journal)
+            on_event(("progress", (i + 1) / max(total, 1) * 100))
+    finally:
+        evaluated.close()
+        if journal:
+            journal.close()
+        if cache_dir:
+            # Siivous kerran, kun työprosessit ovat päättyneet
+            ResultCache(cache_dir, **(cache_options or {})).evict()
+
+    if adaptive is not None:
+        # Adaptiivinen ajo voi päättyä ennen pistebudjettia
+        on_event(("progress", 100))
+        msg(f"Adaptive sweep used {len(sampler.points)} of {sampler.max_points} values")
+        results.sort()
+
+    if recorder:
+        recorder.save(record_dir)
+        msg(f"Saved {len(recorder.columns)} output columns to {record_dir}")
+
+    if timing:
+        timer = stage_timing.current()
+        timer.write_trace(timing)
+        msg(timer.format_summary())
+        msg(f"Saved timing trace to {timing}")
+        stage_timing.disable()
+
+    return results
+
+
+def _number(text):
+    """ Komentoriviarvo: kokonaisluku jos mahdollista, muuten desimaaliluku. """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Mathcad Prime worksheet over a range of input values.")
+    parser.add_argument("worksheet", help="Mathcad worksheet (.mcdx)")
+    parser.add_argument("start", type=_number, nargs="?", help="Start value for the first input")
+    parser.add_argument("end", type=_number, nargs="?", help="End value for the first input")
+    parser.add_argument("--step", type=_number, default=1, help="Step between input values")
+    parser.add_argument("--visible", action="store_true", help="Show Mathcad window")
+    parser.add_argument("--script", help="Python script to run after each value")
+    parser.add_argument("--recycle-after", type=int, default=0,
+                        help="Restart Mathcad after N values (0 = keep one session)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--replay", action="store_true",
+                        help="Replay a tab separated result table (e.g. results.txt) instead of Mathcad")
+    parser.add_argument("--replay-delay", type=float, default=0.0,
+                        help="Simulated calculation time per value in replay mode [s]")
+    parser.add_argument("--cache", metavar="DIR", help="Reuse results from an on-disk cache directory")
+    parser.add_argument("--cache-max-mb", type=float, default=50, help="Cache size limit in megabytes")
+    parser.add_argument("--cache-max-age", type=float, default=30, help="Drop cache entries older than N days")
+    parser.add_argument("--record", metavar="DIR", help="Save all outputs of every value as .npy columns")
+    parser.add_argument("--journal", metavar="FILE", help="Append every finished value to a crash-safe journal")
+    parser.add_argument("--resume", action="store_true", help="Skip values already in the journal")
+    parser.add_argument("--overwrite", action="store_true", help="Start an existing journal from scratch")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Refine a coarse grid where the outputs bend or change steeply")
+    parser.add_argument("--adaptive-output", action="append", metavar="ALIAS",
+                        help="Output alias used for refinement (repeatable, default = first output)")
+    parser.add_argument("--coarse-points", type=int, default=11, help="Initial grid size in adaptive mode")
+    parser.add_argument("--max-points", type=int, default=101, help="Value budget in adaptive mode")
+    parser.add_argument("--max-deviation", type=float, default=0.01,
+                        help="Allowed deviation from a straight line, relative to the output range")
+    parser.add_argument("--max-change", type=float,
+                        help="Allowed output change per interval, relative to the output range")
+    parser.add_argument("--timing", metavar="FILE",
+                        help="Time each stage, print a summary and write a Chrome trace JSON file")
+    parser.add_argument("--grid", metavar="SPEC",
+                        help="JSON sweep specification over several input aliases (see sweep_grid)")
+    args = parser.parse_args()
+    if args.grid is None and (args.start is None or args.end is None):
+        parser.error("start and end are required unless --grid is given")
+    if args.workers > 1 and args.script:
+        parser.error("--workers > 1 cannot be combined with --script")
+    if args.cache and args.script:
+        parser.error("--cache cannot be combined with --script")
+
+    adaptive = None
+    if args.adaptive:
+        adaptive = {"outputs": args.adaptive_output, "coarse_points": args.coarse_points,
+                    "max_points": args.max_points, "max_deviation": args.max_deviation,
+                    "max_change": args.max_change}
+
+    backend_factory = None
+    if args.replay:
+        backend_factory = partial(ReplayBackend, args.worksheet, delay=args.replay_delay)
+
+    run_sweep(os.path.abspath(args.worksheet), args.start, args.end, visible=args.visible,
+              python_script_path=args.script, recycle_after=args.recycle_after,
+              backend_factory=backend_factory, workers=args.workers, cache_dir=args.cache,
+              record_dir=args.record, journal_path=args.journal, resume=args.resume,
+              step=args.step, adaptive=adaptive, grid=load_spec(args.grid) if args.grid else None,
+              timing=args.timing, overwrite=args.overwrite,
+              cache_options={"max_bytes": int(args.cache_max_mb * 1024 * 1024), "max_age_days": args.cache_max_age})
+
+
+if __name__ == "__main__":
+    main()
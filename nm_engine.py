@@ -0,0 +1,272 @@
+"""
+N–M-yhteisvaikutuskäyrän laskenta NumPyllä ilman Mathcadia.
+
+Laskee saman murtorajatilan venymätilasarjan kuin 1-NM-Kuvaaja-Current.mcdx suoralle (α = 0°) ja
+vinolle (α = 45°) kuormitukselle ja kirjoittaa <nimi>-chart.csv-tiedoston, jota datasheet.py lukee
+(parse_chart_data). Parametrit luetaan samasta testitiedostosta (./TempFiles/<nimi>.csv), jonka
+laskentalehti kirjoittaa: b, lv, lv2, fii, fiieff, fyk, Es, fck, alphaCC, gammaS, gammaC, gammaP,
+myyS, myyC, tkb ja Cmodel. Sarakkeen gammaP arvo on laskentalehden μp.
+
+Laskentalehden kaavat:
+    poikkileikkaus   neliö b x b, kierretään kulmaan α ja keskitetään y-suunnassa
+    raudoitus        4 tankoa (lv2 = 0) tai 8 tankoa, pinta-ala π ϕ² / 4, ϕ = fiieff
+    lujuudet         fck = fck μc μp, fcd = αcc fck / γc, fyd = fyk μs / γs
+    betoni           paraabeli-suorakaide (Cmodel = 2) tai bilineaarinen (Cmodel = 3), ec2_materials
+    teräs            Es ε, kuitenkin enintään fyd
+    venymä           lineaarinen: ε = y0 alareunassa (y_min) ja y1 yläreunassa (y_max)
+    N                ∫σc dA + Σ (σs - tkb σc) As
+    M                -(∫σc y dA + Σ (σs - tkb σc) As y)
+
+Venymätilat (CPoints) ovat (y0, εs), missä εs on venymä koordinaatissa b - r_e kuten laskentalehden
+tts-funktiossa: (εc, εc), (εcu, 0), (εcu, 0 … εsu) 41 tilaa ja (εcu … εsu, εsu) 21 tilaa, εsu = -0,01.
+
+Betonin pinta integroidaan vaakakaistoina (strips) fiber_mesh-kuituverkolla, joka on välimuistissa
+geometrian mukaan.
+Yksikkönä on mm ja MPa, tulokset kN ja kNm.
+
+Vertailut:
+    compare_with_worksheet   murtorajatilan tulos (uls_results) laskentalehden kirjoittamaan
+                             <nimi>-chart.csv-tiedostoon sekä testitiedoston Nmax-, Nmin- ja NMmax-arvoihin
+    check_section_integration  pelkkä poikkileikkauksen integrointi: results.txt-taulukon
+                             (SLS-laskentalehden resultV2) venymätilat kimmoisella betonilla ja kahdella
+                             tangolla; ei tarkista murtorajatilan materiaalimalleja eikä venymätiloja
+
+Käyttö:
+    python nm_engine.py "./TempFiles/235-80 4D20-660 DE.csv"
+    python nm_engine.py "./TempFiles/235-80 4D20-660 DE.csv" --reference "./TempFiles/235-80 4D20-660 DE-chart.csv"
+    python nm_engine.py --check-integration results.txt
+"""
+
+import argparse
+import csv
+import math
+import os
+
+import numpy as np
+
+from ec2_materials import (bilinear_steel, concrete_class, concrete_strain_limits, concrete_stress,
+                           design_strengths, elastic_concrete)
+from fiber_mesh import fiber_mesh
+
+
+def read_parameters(file_name):
+    """ Lukee laskentalehden kirjoittaman testitiedoston (nimi, arvo) -rivit sanakirjaksi. """
+    variables = {}
+    with open(file_name, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) == 2:
+                key, value = row[0].strip(), row[1].strip()
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+                variables[key] = value
+    return variables
+
+
+def mathcad_round(value, decimals=0):
+    """ Mathcadin round: puolikkaat pyöristetään poispäin nollasta (Pythonin round pyöristää parilliseen). """
+    factor = 10 ** decimals
+    return math.copysign(math.floor(abs(value) * factor + 0.5), value) / factor
+
+
+# --- Poikkileikkaus ---
+
+def square_polygon(b):
+    """ Laskentalehden B_koords: x 0..b, y -b/2..b/2. """
+    return [(0.0, -b / 2), (0.0, b / 2), (b, b / 2), (b, -b / 2)]
+
+
+def uls_bars(b, lv1, lv2, phi):
+    """ Laskentalehden Rebars_Koords: 4 tankoa nurkissa tai 8 tankoa (lv2 > 0). """
+    area = math.pi * (phi / 2) ** 2
+    if lv2 == 0:
+        r_e = (b - lv1) / 2
+        points = [(r_e, r_e - b / 2), (r_e, b / 2 - r_e), (b - r_e, b / 2 - r_e), (b - r_e, r_e - b / 2)]
+    else:
+        xs = [b / 2 - lv2 / 2, b / 2 + lv2 / 2, b / 2 - lv2 / 2, b / 2 + lv2 / 2,
+              b / 2 - lv1 / 2, b / 2 + lv1 / 2, b / 2 - lv1 / 2, b / 2 + lv1 / 2]
+        ys = [lv1 / 2, lv1 / 2, -lv1 / 2, -lv1 / 2, lv2 / 2, lv2 / 2, -lv2 / 2, -lv2 / 2]
+        points = list(zip(xs, ys))
+    return [(x, y, area) for x, y in points]
+
+
+# --- Murtorajatilan käyrä ---
+
+def strain_states(eps_c, eps_cu, eps_su=-0.01, tr1=40, tr2=20):
+    """ Laskentalehden CPoints: taulukko (y0, εs) -pareja. """
+    y0 = [eps_c, eps_cu]
+    es = [eps_c, 0.0]
+    y0 += [eps_cu] * (tr1 + 1)
+    es += list(np.linspace(0.0, eps_su, tr1 + 1))
+    y0 += list(np.linspace(eps_cu, eps_su, tr2 + 1))
+    es += [eps_su] * (tr2 + 1)
+    return np.array(y0), np.array(es)
+
+
+def uls_curve(params, alpha_deg=0.0, strips=2000):
+    """ Palauttaa (M [kNm], N [kN]) taulukot laskentalehden venymätiloille. """
+    b = params["b"]
+    lv1 = params["lv"]
+    lv2 = params.get("lv2", 0)
+    phi = params.get("fiieff", params["fii"])
+    model = int(params.get("Cmodel", 2))
+    tkb = params.get("tkb", 1)
+    es = params.get("Es", 200) * 1000
+
+    fck, fcd, fyd = design_strengths(
+        params["fck"], params["fyk"], alpha_cc=params.get("alphaCC", 1), gamma_c=params.get("gammaC", 1.5),
+        gamma_s=params.get("gammaS", 1.15), myy_c=params.get("myyC", 1), myy_p=params.get("gammaP", 1),
+        myy_s=params.get("myyS", 1))
+    eps_c, eps_cu = concrete_strain_limits(fck, model)
+
+    section = fiber_mesh(square_polygon(b), uls_bars(b, lv1, lv2, phi), alpha_deg, strips)
+
+    # tts: εs annetaan koordinaatissa b - r_e, josta suora jatketaan yläreunaan (y1)
+    y0, eps_s = strain_states(eps_c, eps_cu)
+    r_e = (b - lv1) / 2
+    y1 = y0 + (eps_s - y0) * (section.y_max - section.y_min) / ((b - r_e) - section.y_min)
+
+    n, m = section.forces(y0, y1,
+                          lambda eps: concrete_stress(eps, fck, fcd, model),
+                          lambda eps: bilinear_steel(eps, fyd, es), tkb)
+    return -m, n
+
+
+def zero_force_moment(m, n):
+    """ Momentti kohdassa N = 0: suora ensimmäisen negatiivisen N:n ja sitä edeltävän pisteen kautta. """
+    negative = np.flatnonzero(n < 0)
+    j = negative[0] if len(negative) else len(n) - 1
+    if m[j] == m[j - 1]:
+        return float(m[j])
+    slope = (n[j] - n[j - 1]) / (m[j] - m[j - 1])
+    return float(m[j] - n[j] / slope)
+
+
+def uls_results(params, strips=2000):
+    """ Suoran ja vinon käyrän pisteet (chart) ja datalehden tunnusluvut kuten laskentalehden toCSV. """
+    m_direct, n_direct = uls_curve(params, 0.0, strips)
+    m_biax, n_biax = uls_curve(params, 45.0, strips)
+
+    nm_direct = mathcad_round(m_direct.max())
+    nm_biax = mathcad_round(m_biax.max())
+    nm0_direct = mathcad_round(zero_force_moment(m_direct, n_direct))
+    nm0_biax = mathcad_round(zero_force_moment(m_biax, n_biax))
+    return {
+        "chart": [m_direct, n_direct, m_biax, n_biax],
+        "Nmax": mathcad_round(n_direct.max()),
+        "Nmin": mathcad_round(n_direct.min()),
+        "NMmax": min(nm_direct, nm_biax),
+        "NM0kN": min(nm0_direct, nm0_biax),
+        "NMdirect": nm_direct,
+        "NMbiax": nm_biax,
+        "NM0kNdirect": nm0_direct,
+        "NM0kNbiax": nm0_biax,
+    }
+
+
+def write_chart_csv(chart, file_name):
+    """ Kirjoittaa käyrät riveittäin: M suora, N suora, M vino, N vino (datasheet.parse_chart_data). """
+    with open(file_name, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for row in chart:
+            writer.writerow([repr(float(v)) for v in row])
+
+
+# --- Vertailu laskentalehteen ---
+
+def read_chart_csv(file_name):
+    """ Lukee käyrätiedoston rivit taulukoiksi: M suora, N suora, M vino, N vino. """
+    with open(file_name, newline='', encoding='utf-8') as f:
+        return [np.array([float(v) for v in row]) for row in csv.reader(f) if row]
+
+
+def compare_with_worksheet(test_file, chart_file, strips=2000):
+    """ Vertaa uls_results-tulosta laskentalehden samalle testitiedostolle kirjoittamaan käyrätiedostoon.
+    Palauttaa käyrien suurimmat erot N [kN] ja M [kNm] sekä datalehden tunnusluvut pareina
+    (NumPy, laskentalehti). """
+    params = read_parameters(test_file)
+    results = uls_results(params, strips)
+    reference = read_chart_csv(chart_file)
+    if len(reference) < 4:
+        raise ValueError(f"{chart_file} has {len(reference)} rows, expected 4")
+    for computed, expected in zip(results["chart"], reference):
+        if len(computed) != len(expected):
+            raise ValueError(f"{chart_file} has {len(expected)} points per curve, expected {len(computed)}")
+
+    m_rows, n_rows = (0, 2), (1, 3)
+    report = {
+        "points": len(reference[0]),
+        "N_max_error": max(float(np.abs(results["chart"][i] - reference[i]).max()) for i in n_rows),
+        "M_max_error": max(float(np.abs(results["chart"][i] - reference[i]).max()) for i in m_rows),
+        "N_range": max(float(np.ptp(reference[i])) for i in n_rows),
+        "M_range": max(float(np.ptp(reference[i])) for i in m_rows),
+    }
+    for key in ("Nmax", "Nmin", "NMmax"):
+        report[key] = (results[key], params.get(key))
+    return report
+
+
+def check_section_integration(file_name="results.txt", b=232.0, lv=80.0, phi=20.0, fck=60.0, btn=1.0,
+                              strips=2000):
+    """ Tarkistaa vain poikkileikkauksen integroinnin (fiber_mesh): laskee results.txt:n venymätilat
+    (top_ok, bottom_ok) kimmoisella betonilla ja palauttaa suurimmat erot N [kN] ja M [kNm] -sarakkeisiin.
+    Murtorajatilan tulosta verrataan compare_with_worksheet-funktiolla. Oletukset ovat taulukon
+    laskentalehden arvot (B = 232, lv = 80, ϕ = 20, fck = 60, kierot = 1, diag = 0). """
+    table = np.loadtxt(file_name, delimiter='\t')
+    e_eff = concrete_class(fck).Ecm / (1 + 1.6)
+    area = math.pi * (phi / 2) ** 2
+
+    polygon = [(-b / 2, -b / 2), (b / 2, -b / 2), (b / 2, b / 2), (-b / 2, b / 2)]
+    bars = [(-lv / 2, lv / 2, area), (lv / 2, -lv / 2, area)]
+    section = fiber_mesh(polygon, bars, 0.0, strips)
+
+    top, bottom = table[:, 5], table[:, 6]
+    n, m = section.forces(bottom, top, lambda eps: elastic_concrete(eps, e_eff),
+                          lambda eps: eps * 200000.0, btn)
+    return {
+        "rows": len(table),
+        "N_max_error": float(np.abs(n - table[:, 1]).max()),
+        "M_max_error": float(np.abs(m - table[:, 2]).max()),
+        "N_range": float(np.ptp(table[:, 1])),
+        "M_range": float(np.ptp(table[:, 2])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute ULS N-M interaction curves without Mathcad.")
+    parser.add_argument("test_file", nargs="?", help="Test CSV written by the worksheet (./TempFiles/<name>.csv)")
+    parser.add_argument("--out", help="Chart CSV (default: <name>-chart.csv next to the test file)")
+    parser.add_argument("--reference", metavar="CHART",
+                        help="Compare with a chart CSV written by the worksheet for the same test file (no output)")
+    parser.add_argument("--check-integration", metavar="TABLE",
+                        help="Check the section integration (elastic concrete) against results.txt")
+    args = parser.parse_args()
+    if args.reference and not args.test_file:
+        parser.error("--reference requires a test file")
+
+    if args.check_integration:
+        report = check_section_integration(args.check_integration)
+        print(f"{report['rows']} strain states: "
+              f"max |dN| = {report['N_max_error']:.4f} kN of {report['N_range']:.1f} kN, "
+              f"max |dM| = {report['M_max_error']:.4f} kNm of {report['M_range']:.1f} kNm")
+    if args.reference:
+        report = compare_with_worksheet(args.test_file, args.reference)
+        print(f"{report['points']} points per curve: "
+              f"max |dN| = {report['N_max_error']:.4f} kN of {report['N_range']:.1f} kN, "
+              f"max |dM| = {report['M_max_error']:.4f} kNm of {report['M_range']:.1f} kNm")
+        for key in ("Nmax", "Nmin", "NMmax"):
+            computed, expected = report[key]
+            print(f"{key}: {computed:g} (worksheet {expected})")
+    elif args.test_file:
+        params = read_parameters(args.test_file)
+        results = uls_results(params)
+        out = args.out or os.path.splitext(args.test_file)[0] + "-chart.csv"
+        write_chart_csv(results["chart"], out)
+        for key in ("Nmax", "Nmin", "NMmax", "NM0kN", "NMdirect", "NMbiax", "NM0kNdirect", "NM0kNbiax"):
+            print(f"{key}: {results[key]:g}")
+        print(f"Käyrätiedosto tallennettu: {out}")
+
+
+if __name__ == "__main__":
+    main()
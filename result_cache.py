@@ -0,0 +1,113 @@
+"""
+Laskentatulosten levyvälimuisti.
+
+Avain muodostetaan laskentalehden sisällön SHA-256-tiivisteestä ja syötteiden (alias, arvo) -pareista,
+joten pelkkä tiedoston tallennus tai siirto ei mitätöi tuloksia, mutta mikä tahansa muutos
+laskentalehteen mitätöi. Jokainen merkintä on oma JSON-tiedostonsa, jossa on kaikkien tulosten
+RealResult ja Units.
+
+Huom: välimuisti tallentaa vain tulosarvot. Laskentalehden itse kirjoittamat tiedostot
+(esim. WRITECSV ./TempFiles-kansioon) eivät synny välimuistiosumalla. Siksi mathcad_sweep ei salli
+välimuistia yhdessä jälkikäsittelyskriptin tai koukkujen kanssa.
+
+Syötearvot muutetaan avaimessa liukuluvuiksi, joten 5 ja 5.0 osuvat samaan merkintään.
+
+Välimuisti pidetään rajattuna evict-funktiolla: yli max_age_days vanhat merkinnät poistetaan,
+ja jos kokonaiskoko ylittää max_bytes, poistetaan pisimpään käyttämättömät. Poisto tehdään kerran
+ajon lopuksi pääprosessissa (mathcad_sweep), ei jokaisessa työprosessissa.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+
+def normalized_inputs(inputs):
+    """ Syötteet aakkosjärjestyksessä; lukuarvot liukulukuina. """
+    return sorted((alias, float(value) if isinstance(value, (int, float)) else value)
+                  for alias, value in inputs.items())
+
+
+class ResultCache:
+    """ Sisältöosoitteinen välimuisti laskentalehden tuloksille. """
+
+    def __init__(self, cache_dir=".mathcad_cache", max_bytes=50 * 1024 * 1024, max_age_days=30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._worksheet_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def worksheet_hash(self, worksheet_path):
+        """ Laskentalehden sisällön tiiviste; luetaan uudelleen vain jos tiedosto on muuttunut. """
+        stat = os.stat(worksheet_path)
+        stamp = (worksheet_path, stat.st_mtime_ns, stat.st_size)
+        if stamp not in self._worksheet_hashes:
+            digest = hashlib.sha256()
+            with open(worksheet_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._worksheet_hashes[stamp] = digest.hexdigest()
+        return self._worksheet_hashes[stamp]
+
+    def key(self, worksheet_path, inputs):
+        """ Avain = laskentalehden tiiviste + syötteet aakkosjärjestyksessä. """
+        payload = json.dumps([self.worksheet_hash(worksheet_path), normalized_inputs(inputs)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, worksheet_path, inputs):
+        """ Palauttaa {alias: (RealResult, Units)} tai None, jos tulosta ei ole välimuistissa. """
+        path = self._path(self.key(worksheet_path, inputs))
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Käyttöaika talteen LRU-poistoa varten
+        os.utime(path)
+        return {alias: (value, units) for alias, value, units in entry["outputs"]}
+
+    def put(self, worksheet_path, inputs, outputs):
+        path = self._path(self.key(worksheet_path, inputs))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "inputs": normalized_inputs(inputs),
+            "outputs": [[alias, value, units] for alias, (value, units) in outputs.items()],
+        }
+        # Kirjoitus ensin väliaikaistiedostoon, jotta rinnakkaiset prosessit eivät näe puolikasta merkintää
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """ Poistaa vanhentuneet merkinnät ja pitää kokonaiskoon alle max_bytes. Palauttaa poistettujen määrän. """
+        entries = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        oldest_allowed = time.time() - self.max_age_days * 24 * 3600
+        total = sum(size for mtime, size, path in entries)
+        # Vanhimmat ensin: ensin ikäraja, sitten kokoraja
+        for mtime, size, path in sorted(entries):
+            if mtime >= oldest_allowed and total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
@@ -0,0 +1,342 @@
+"""
+Käyttörajatilan (SLS) jännitysrajoitettu N–M-käyrä ilman Mathcadia.
+
+Laskee saman sarjan kuin "2 NM-Kuvaaja SLS Datasheet current.mcdx" (taulukko resultV2, ks. results.txt)
+ja kirjoittaa samat tiedostot, joita RuotsiAjoULSSLS.py, yhdistys4.py ja datasheetSLS.py lukevat:
+    SLS-chart-SLS-<diag>-<kierot>.csv   rivit M [kNm] ja N [kN]
+    SLS-data-<diag>-<kierot>.csv        NmaxSLS, NminSLS ja NMmaxSLS
+Myös kierot = 0 kirjoitetaan indeksin kanssa (SLS-chart-SLS-<diag>-0.csv), koska yhdistys4.py kirjoittaa
+osista -1 ja -2 yhdistetyn käyrän nimellä SLS-chart-SLS-<diag>.csv. Lukijat käyttävät -0-tiedostoa ja
+laskentalehden kirjoittamaa SLS-chart-SLS-<diag>.csv / SLS-data-<diag>.csv-tiedostoa sen mukaan,
+kumpi on uudempi, ja tulostavat käytetyn tiedoston.
+
+Laskentalehden malli:
+    poikkileikkaus   neliö B x B, diag = 1 kiertää 45°; kaksi tankoa (kierot = 1: vastakkaiset nurkat
+                     (-lv/2, lv/2) ja (lv/2, -lv/2), muuten (-lv/2, -lv/2) ja (lv/2, lv/2))
+    betoni           kimmoinen ilman vetoa, Eeff = Ecm / (1 + 1,6), σc ≤ 0,6 fck
+    teräs            kimmoinen Es ε, εs ≤ fyk / Es
+    N, M             ∫σc dA + Σ (Es ε - btn σc) As, momentti vastaavasti y-varrella
+    venymätilat      yläreuna εc.max, alin tanko εc.max … -εs.max askeleella 0,0001, sitten yläreuna
+                     εc.max … -εs.max alimman tangon venymällä -εs.max
+    halkeilu         EC2 7.3.4: Wk = sr.max Δεm; jos Wk > 0,4 mm, alareunan venymää kasvatetaan
+                     askeleella 0,000001, kunnes Wk ≤ 0,4 mm (laskentalehden ok-funktio)
+
+Parametrit luetaan ULS-laskentalehden testitiedostosta (nm_engine.read_parameters): b, lv, fii, fck,
+fyk, Es, myyC ja myyS.
+
+Useita tuotteita voi laskea kerralla (evaluate_products, --workers rinnakkain). Tällöin tiedostot
+kirjoitetaan tuotteen omaan kansioon <out>/<testitiedoston nimi ilman .csv>/, koska tiedostonimissä ei
+ole tuotteen nimeä.
+
+Käyttö:
+    python sls_engine.py "./TempFiles/235-80 4D20-660 DE.csv" --out ./TempFiles --update-test-file
+    python sls_engine.py ./tuotteet/*.csv --out ./SLS --workers 4
+    python sls_engine.py --validate results.txt
+"""
+
+import argparse
+import csv
+import math
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from ec2_materials import concrete_class, elastic_concrete
+from fiber_mesh import fiber_mesh
+from nm_engine import mathcad_round, read_parameters
+
+# resultV2:n sarakkeet (results.txt), nro on ensimmäinen
+RESULT_COLUMNS = [
+    "nro", "N", "M", "top", "bottom", "top_ok", "bottom_ok", "W_k", "X", "h_c_eff", "A_c_eff",
+    "x_coord", "h_c_eff_coord", "A_nelio", "s_r_max", "delta_eps_m", "k_2", "rho_p_eff", "A_s_tension",
+]
+
+# Laskentalehden "9999 km" puristetun/vedetyn alueen korkeudelle tasaisella venymällä [mm]
+_FAR = 9999e6
+
+# Oletuksena lasketaan molemmat suunnat ja tankoparit: -1 ja -2 yhdistys4:lle, kierot = 0
+# (tiedostot -0) RuotsiAjoULSSLS.py:lle ja datasheetSLS.py:lle
+DEFAULT_CASES = ((0, 1), (0, 2), (1, 1), (1, 2), (0, 0), (1, 0))
+
+
+class SlsModel:
+    """ Yhden tuotteen ja tapauksen (diag, kierot) SLS-laskenta. Yksiköt mm ja MPa. """
+
+    def __init__(self, b, lv, phi, fck, fyk=500.0, es=200000.0, kierot=1, diag=0, btn=1.0,
+                 stress_limit=0.6, creep=1.6, wk_limit=0.4, step=0.0001, strips=2000):
+        self.b = b
+        self.phi = phi
+        self.diag = diag
+        self.btn = btn
+        self.es = es
+        self.wk_limit = wk_limit
+        self.step = step
+
+        concrete = concrete_class(fck)
+        self.e_eff = concrete.Ecm / (1 + creep)
+        self.fct_eff = concrete.fctm
+        self.alpha_e = es / concrete.Ecm
+        self.eps_c_max = stress_limit * fck / self.e_eff
+        self.eps_s_max = fyk / es
+
+        self.bar_area = math.pi * (phi / 2) ** 2
+        if kierot == 1:
+            bars = [(-lv / 2, lv / 2), (lv / 2, -lv / 2)]
+        else:
+            bars = [(-lv / 2, -lv / 2), (lv / 2, lv / 2)]
+        polygon = [(-b / 2, -b / 2), (b / 2, -b / 2), (b / 2, b / 2), (-b / 2, b / 2)]
+        # Laskentalehden turn kertoo rivivektorit oikealta (mat R(α)), eli kierto on -α
+        self.section = fiber_mesh(polygon, [(x, y, self.bar_area) for x, y in bars], -45.0 * diag, strips)
+
+        self.y_min = self.section.y_min
+        self.y_max = self.section.y_max
+        self.height = self.y_max - self.y_min
+        self.width = np.ptp(self.section.corners[:, 0])
+        self.bar_y = self.section.bar_y
+        # Tangon etäisyys kiertämättömän poikkileikkauksen alareunasta (terasBetonista)
+        self.cover = self.bar_y.min() + b / 2
+
+    def strain_at(self, top, bottom, y):
+        """ Venymä korkeudella y: lineaarinen yläreunan (y_max) ja alareunan (y_min) välillä. """
+        return bottom + (top - bottom) * (y - self.y_min) / self.height
+
+    def bottom_for_bar_strain(self, top, bar_strain):
+        """ ε_x0: alareunan venymä, kun yläreunassa on top ja alimmassa tangossa bar_strain. """
+        lowest = self.bar_y.min()
+        return top + (bar_strain - top) * (self.y_min - self.y_max) / (lowest - self.y_max)
+
+    def points(self):
+        """ Laskentalehden points: (yläreuna, alareuna) -venymäparit. """
+        top_start = bottom_start = self.eps_c_max
+        end = -self.eps_s_max
+        top, bottom = [top_start], [bottom_start]
+
+        bottom_ht = bottom_start
+        while bottom_ht >= end:
+            eps = self.bottom_for_bar_strain(top_start, bottom_ht)
+            top.append(top_start)
+            bottom.append(top_start if abs(top_start - eps) < 1e-18 else eps)
+            bottom_ht -= self.step
+        top.append(top_start)
+        bottom.append(self.bottom_for_bar_strain(top_start, end))
+
+        top_c = top_start
+        while top_c > end:
+            top.append(top_c)
+            bottom.append(self.bottom_for_bar_strain(top_c, end))
+            top_c -= self.step
+        top.append(end)
+        bottom.append(end)
+        return np.array(top), np.array(bottom)
+
+    def forces(self, top, bottom):
+        """ N [kN] ja M [kNm] venymätiloille. """
+        return self.section.forces(bottom, top, lambda eps: elastic_concrete(eps, self.e_eff),
+                                   lambda eps: eps * self.es, self.btn)
+
+    def crack_width(self, top, bottom):
+        """ Halkeamaleveys ja sen välitulokset taulukoina (sarakkeet W_k … A_s_tension). """
+        top = np.asarray(top, dtype=float)
+        bottom = np.asarray(bottom, dtype=float)
+        same = top == bottom
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Neutraaliakselin paikka (x_coord) ja puristetun alueen korkeus X
+            x_coord = np.where(same, np.where(top > 0, -_FAR, _FAR),
+                               self.y_max - top * self.height / (top - bottom))
+            x_depth = np.where(same, np.where(top > 0, _FAR, -_FAR), self.y_max - x_coord)
+            x_depth = np.where(top < bottom, np.nan, x_depth)
+
+            if self.diag == 0:
+                h_c_eff = np.minimum(np.minimum(2.5 * self.cover, (self.height - x_depth) / 3), self.height / 2)
+                a_nelio = h_c_eff * self.b
+            else:
+                h_c_eff = np.full_like(top, self.height / 2)
+                a_nelio = h_c_eff ** 2
+            a_c_eff = np.maximum(np.minimum(a_nelio, self.width * self.height / 2), 0.0)
+
+            # Vedetyt tangot: neutraaliakselin alapuolella ja keskiviivan alapuolella
+            below = x_coord[..., None] >= self.bar_y
+            weight = np.where(self.bar_y < 0, 1.0, np.where(self.bar_y == 0, 0.5, 0.0))
+            a_s_tension = (below * weight).sum(axis=-1) * self.bar_area
+            rho = np.where(a_c_eff == 0, 0.0, a_s_tension / a_c_eff)
+
+            bar_strain = self.strain_at(top[..., None], bottom[..., None], self.bar_y)
+            sigma_s = -(bar_strain * self.es).min(axis=-1)
+            kt = 0.4
+            delta_eps = np.where(rho != 0,
+                                 (sigma_s - kt * self.fct_eff / rho * (1 + self.alpha_e * rho)) / self.es,
+                                 0.6 * sigma_s / self.es)
+            delta_eps = np.maximum(delta_eps, 0.6 * sigma_s / self.es)
+
+            k_2 = np.clip((-top - bottom) / (-2 * np.minimum(top, bottom)), None, 1.0)
+            k_2 = np.where(k_2 < 0.5, 0.5, k_2)
+            s_r_max = np.where(a_s_tension > 0, 7 * self.phi + 0.8 * k_2 * 0.425 * self.phi / rho,
+                               1.3 * (self.height - x_depth))
+
+        return {
+            "W_k": delta_eps * s_r_max, "X": x_depth, "h_c_eff": h_c_eff, "A_c_eff": a_c_eff,
+            "x_coord": x_coord, "h_c_eff_coord": self.y_min + h_c_eff, "A_nelio": a_nelio,
+            "s_r_max": s_r_max, "delta_eps_m": delta_eps, "k_2": k_2, "rho_p_eff": rho,
+            "A_s_tension": a_s_tension,
+        }
+
+    def limit_crack_width(self, top, bottom, block=4096, max_steps=10 ** 7):
+        """ Laskentalehden ok: kasvattaa alareunan venymää askeleella step/100, kunnes Wk ≤ raja.
+        Yläreuna seuraa alareunaa, jos alareuna ohittaa sen. Kaikki pisteet lasketaan kerralla
+        lohkoittain (block askelta). """
+        top = np.array(top, dtype=float)
+        bottom = np.array(bottom, dtype=float)
+        increment = self.step * 0.01
+
+        pending = np.flatnonzero((bottom < 0) & ~(self.crack_width(top, bottom)["W_k"] <= self.wk_limit))
+        done_steps = 0
+        while len(pending):
+            if done_steps >= max_steps:
+                raise RuntimeError("Crack width limit not reached")
+            # Peräkkäinen summaus cumsum-funktiolla vastaa laskentalehden toistuvaa lisäystä
+            steps = np.empty((len(pending), block + 1))
+            steps[:, 0] = bottom[pending]
+            steps[:, 1:] = increment
+            candidates = np.cumsum(steps, axis=1)[:, 1:]
+            tops = np.maximum(top[pending, None], candidates)
+            ok = self.crack_width(tops, candidates)["W_k"] <= self.wk_limit
+
+            found = ok.any(axis=1)
+            first = ok.argmax(axis=1)
+            rows = pending[found]
+            bottom[rows] = candidates[found, first[found]]
+            top[rows] = tops[found, first[found]]
+            # Keskeneräiset jatkavat lohkon viimeisestä arvosta
+            bottom[pending[~found]] = candidates[~found, -1]
+            top[pending[~found]] = tops[~found, -1]
+            pending = pending[~found]
+            done_steps += block
+        return top, bottom
+
+    def result_table(self):
+        """ resultV2: taulukko (rivit, 19 saraketta) kuten results.txt. """
+        point_top, point_bottom = self.points()
+        top, bottom = point_top.copy(), point_bottom.copy()
+        # Ensimmäiselle pisteelle ei tehdä halkeamakorjausta
+        top[1:], bottom[1:] = self.limit_crack_width(point_top[1:], point_bottom[1:])
+
+        n, m = self.forces(top, bottom)
+        crack = self.crack_width(top, bottom)
+        columns = [np.arange(1, len(top) + 1), n, m, point_top, point_bottom, top, bottom]
+        columns += [crack[name] for name in RESULT_COLUMNS[7:]]
+        return np.column_stack(columns)
+
+
+def model_from_parameters(params, kierot=1, diag=0, **options):
+    """ SlsModel ULS-testitiedoston parametreista (b, lv, fii, fck, fyk, Es, myyC, myyS). """
+    return SlsModel(
+        b=params["b"], lv=params["lv"], phi=params["fii"],
+        fck=params["fck"] * params.get("myyC", 1), fyk=params.get("fyk", 500) * params.get("myyS", 1),
+        es=params.get("Es", 200) * 1000, kierot=kierot, diag=diag, **options)
+
+
+def summary(table):
+    """ SLS-data: suurin N, viimeinen N ja suurin M yhden desimaalin tarkkuudella. """
+    return {
+        "NmaxSLS": mathcad_round(table[:, 1].max(), 1),
+        "NminSLS": mathcad_round(table[-1, 1], 1),
+        "NMmaxSLS": mathcad_round(table[:, 2].max(), 1),
+    }
+
+
+def evaluate_product(params, cases=DEFAULT_CASES):
+    """ Laskee tuotteen kaikki tapaukset: {(diag, kierot): {"chart": (M, N), "data": summary}}. """
+    results = {}
+    for diag, kierot in cases:
+        # kierot = 0 ja 2 antavat saman tankoparin
+        same = (diag, 2 - kierot) if kierot in (0, 2) else None
+        if same in results:
+            results[(diag, kierot)] = results[same]
+            continue
+        table = model_from_parameters(params, kierot=kierot, diag=diag).result_table()
+        results[(diag, kierot)] = {"chart": (table[:, 2], table[:, 1]), "data": summary(table)}
+    return results
+
+
+def _evaluate_file(test_file):
+    return test_file, evaluate_product(read_parameters(test_file))
+
+
+def evaluate_products(test_files, workers=1):
+    """ Laskee useita tuotteita; workers > 1 jakaa tuotteet prosesseille. Palauttaa (tiedosto, tulokset). """
+    if workers > 1 and len(test_files) > 1:
+        with Pool(min(workers, len(test_files))) as pool:
+            return pool.map(_evaluate_file, test_files)
+    return [_evaluate_file(test_file) for test_file in test_files]
+
+
+def write_outputs(results, out_dir):
+    """ Kirjoittaa laskentalehden nimillä SLS-chart-SLS-<diag>-<kierot>.csv ja SLS-data-<diag>-<kierot>.csv. """
+    os.makedirs(out_dir, exist_ok=True)
+    for (diag, kierot), result in results.items():
+        suffix = f"{diag}-{kierot}"
+        with open(os.path.join(out_dir, f"SLS-chart-SLS-{suffix}.csv"), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for row in result["chart"]:
+                writer.writerow([repr(float(v)) for v in row])
+        with open(os.path.join(out_dir, f"SLS-data-{suffix}.csv"), 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows((key, f"{value:g}") for key, value in result["data"].items())
+
+
+def update_test_file(test_file, data):
+    """ Korvaa testitiedoston -1-arvot (NmaxSLS, NminSLS, NMmaxSLS) kuten RuotsiAjoULSSLS.py. """
+    with open(test_file, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    for row in rows:
+        if len(row) == 2 and row[0] in data and row[1] == "-1":
+            row[1] = f"{data[row[0]]:g}"
+    with open(test_file, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+
+def validate_results_txt(file_name="results.txt"):
+    """ Vertaa results.txt-taulukkoon (B = 232, lv = 80, ϕ = 20, fck = 60, kierot = 1, diag = 0).
+    Palauttaa sarakkeittain suurimman eron suhteessa sarakkeen vaihteluväliin (äärelliset arvot). """
+    expected = np.loadtxt(file_name, delimiter='\t')
+    table = SlsModel(b=232.0, lv=80.0, phi=20.0, fck=60.0, kierot=1, diag=0).result_table()
+    if table.shape != expected.shape:
+        raise ValueError(f"Shape {table.shape} differs from {file_name} {expected.shape}")
+    errors = {}
+    for i, name in enumerate(RESULT_COLUMNS):
+        finite = np.isfinite(expected[:, i]) & (np.abs(expected[:, i]) < _FAR / 100)
+        scale = np.ptp(expected[finite, i]) or 1.0
+        errors[name] = float(np.abs(table[finite, i] - expected[finite, i]).max() / scale) if finite.any() else 0.0
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute SLS stress-limited N-M curves without Mathcad.")
+    parser.add_argument("test_files", nargs="*", help="Test CSV files written by the ULS worksheet")
+    parser.add_argument("--out", default="./TempFiles", help="Output directory")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for several products")
+    parser.add_argument("--update-test-file", action="store_true",
+                        help="Fill NmaxSLS/NminSLS/NMmaxSLS (-1) in the test file like SLS-data-1-0.csv")
+    parser.add_argument("--validate", metavar="TABLE", help="Compare against results.txt")
+    args = parser.parse_args()
+
+    if args.validate:
+        errors = validate_results_txt(args.validate)
+        worst = max(errors, key=errors.get)
+        print(f"Largest relative difference: {worst} {errors[worst]:.2e}")
+
+    for test_file, results in evaluate_products(args.test_files, args.workers):
+        out_dir = args.out
+        if len(args.test_files) > 1:
+            out_dir = os.path.join(args.out, os.path.splitext(os.path.basename(test_file))[0])
+        write_outputs(results, out_dir)
+        # RuotsiAjoULSSLS.py käyttää SLS-data-1-0.csv:tä (diag = 1, kierot = 0)
+        data = results.get((1, 0), next(iter(results.values())))["data"]
+        if args.update_test_file:
+            update_test_file(test_file, data)
+        print(f"{os.path.basename(test_file)}: " + ", ".join(f"{k} {v:g}" for k, v in data.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Laskentasarjan vaiheiden ajanotto.
+
+Ajanotto on oletuksena pois päältä: stage()-kontekstit eivät silloin tee mitään. Kun ajanotto
+kytketään päälle (enable tai mathcad_sweep --timing FILE tai ympäristömuuttuja MATHCAD_TIMING
+käyttöliittymissä), jokaisen vaiheen kesto kirjataan prosessin yhteiseen ajastimeen.
+
+Vaiheet:
+    dispatch      Mathcad Primen käynnistys (Dispatch + Activate)
+    open          laskentalehden avaus ja aliasten haku
+    set_inputs    SetRealValue ja laskentalehden uudelleenlaskenta
+    read_outputs  OutputGetRealValue kaikille tuloksille
+    cache_lookup  result_cache-välimuistin haku
+    evaluate      koko arvon laskenta taustalla (sis. yllä olevat)
+    hook          on_iteration-koukut ja jälkikäsittelyskriptit
+    gui_redraw    käyttöliittymän päivitys tapahtumista
+
+Yhteenveto (summary) antaa vaiheittain määrän, p50, p95 ja kokonaisajan. Jäljitystiedosto on
+Chrome trace event -muotoa (chrome://tracing tai https://ui.perfetto.dev), ja siinä jokainen
+prosessi ja säie on omalla rivillään.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Prosessin yhteinen ajastin; None = ajanotto pois päältä
+_timer = None
+
+
+class StageTimer:
+    """ Kerää vaiheiden kestot Chrome trace -tapahtumina (mikrosekunteina). """
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **args):
+        # Aikaleima seinäkellosta, jotta eri prosessien tapahtumat osuvat samalle aikajanalle
+        ts = time.time_ns() // 1000
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter_ns() - start) // 1000
+            event = {"name": name, "ph": "X", "ts": ts, "dur": duration,
+                     "pid": os.getpid(), "tid": threading.get_ident()}
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            with self._lock:
+                self.events.append(event)
+
+    def extend(self, events):
+        """ Lisää toisessa prosessissa kerätyt tapahtumat. """
+        with self._lock:
+            self.events.extend(events)
+
+    def drain(self):
+        """ Palauttaa ja tyhjentää kerätyt tapahtumat (työprosessista pääprosessille). """
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def summary(self):
+        """ {vaihe: {"count", "p50", "p95", "total"}}, ajat sekunteina. """
+        durations = {}
+        with self._lock:
+            for event in self.events:
+                durations.setdefault(event["name"], []).append(event["dur"] / 1e6)
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            result[name] = {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "total": sum(values),
+            }
+        return result
+
+    def format_summary(self):
+        lines = [f"{'stage':<14}{'count':>7}{'p50 [ms]':>11}{'p95 [ms]':>11}{'total [s]':>11}"]
+        for name, s in sorted(self.summary().items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{name:<14}{s['count']:>7}{s['p50'] * 1000:>11.1f}{s['p95'] * 1000:>11.1f}{s['total']:>11.2f}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        with self._lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+
+
+def _percentile(sorted_values, percent):
+    """ Lineaarisesti interpoloitu persentiili järjestetystä listasta. """
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def enable():
+    """ Kytkee ajanoton päälle tässä prosessissa ja palauttaa ajastimen (olemassa oleva säilyy). """
+    global _timer
+    if _timer is None:
+        _timer = StageTimer()
+    return _timer
+
+
+def disable():
+    global _timer
+    _timer = None
+
+
+def current():
+    """ Käytössä oleva ajastin tai None. """
+    return _timer
+
+
+@contextmanager
+def stage(name, **args):
+    """ Mittaa vaiheen, jos ajanotto on päällä; muuten ei tee mitään. """
+    if _timer is None:
+        yield
+    else:
+        with _timer.stage(name, **args):
+            yield
@@ -0,0 +1,136 @@
+"""
+Laskentataustat mathcad_sweep-ajolle.
+
+Tausta on olio, jolla on metodit:
+    evaluate(value) -> {alias: (RealResult, Units)}   laskee yhden syötearvon
+    close()                                           vapauttaa resurssit
+
+Syötearvo on joko luku (laskentalehden ensimmäinen syöte) tai sanakirja {alias: arvo} usean
+syötteen ajossa (sweep_grid). ReplayBackend tukee vain lukuja.
+
+Taustan rakentaja ottaa avainsana-argumentin on_message, jolla viestit välitetään ajolle.
+Rinnakkaisajossa jokainen prosessi luo oman taustansa samalla tehdasfunktiolla, joten
+tehtaan pitää olla picklattava (luokka tai functools.partial).
+
+MathcadBackend   Mathcad Prime COM-rajapinnan kautta (vain Windows).
+ReplayBackend    Toistaa valmiin tulostaulukon (esim. results.txt). Ei vaadi Mathcadia, joten sillä
+                 voi testata ja mitata ajoa myös Linuxilla. Taulukon rivien väliset arvot interpoloidaan
+                 lineaarisesti (adaptiivinen ajo).
+CachedBackend    Katsoo ensin result_cache-välimuistista ja laskee vain puuttuvat arvot toisella taustalla.
+"""
+
+import csv
+import time
+from bisect import bisect_left
+
+from result_cache import ResultCache
+from stage_timing import stage
+
+
+class MathcadBackend:
+    """ Laskee arvot Mathcad Primellä; istunto pidetään lämpimänä MathcadSessionPoolissa. """
+
+    def __init__(self, worksheet_path, visible=False, recycle_after=0, on_message=print):
+        # win32com tuodaan vasta tässä, jotta muut taustat toimivat ilman pywin32:ta
+        from mathcad_session import MathcadSessionPool
+
+        self.worksheet_path = worksheet_path
+        self.on_message = on_message
+        self.pool = MathcadSessionPool(visible=visible, recycle_after=recycle_after, on_message=on_message)
+
+    def evaluate(self, value):
+        # Kaatuneen istunnon jälkeen sama arvo yritetään kerran uudella istunnolla
+        # Myös käynnistyksen tai avauksen virhe (acquire) käsitellään samoin
+        for attempt in range(2):
+            session = None
+            try:
+                session = self.pool.acquire(self.worksheet_path)
+                inputs = value if isinstance(value, dict) else {session.first_input: value}
+                session.set_inputs(inputs)
+                outputs = session.read_outputs()
+                self.pool.release(session)
+                return outputs
+            except Exception as ex:
+                self.on_message(f"Mathcad error for input {value}: {ex}")
+                if session is not None:
+                    self.pool.release(session, failed=True)
+        return {}
+
+    def close(self):
+        self.on_message("Mathcad Prime will be closed if all open modified worksheets are saved and there are no other COM clients.")
+        self.pool.close_all()
+
+
+# results.txt on SLS-laskentalehden resultV2-taulukko: syötearvo (nro) ja 18 tulossaraketta
+RESULTS_TXT_COLUMNS = [
+    ("N", "kN"), ("M", "kNm"), ("eps_top", ""), ("eps_bottom", ""),
+    ("eps_top_ok", ""), ("eps_bottom_ok", ""), ("W_k", "mm"), ("X", "mm"), ("h_c_eff", "mm"),
+    ("A_c_eff", "mm^2"), ("x_coord", "mm"), ("h_c_eff_coord", "mm"), ("A_nelio", "mm^2"),
+    ("s_r_max", "mm"), ("delta_eps_m", ""), ("k_2", ""), ("rho_p_eff", ""), ("A_s_tension", "mm^2"),
+]
+
+
+class ReplayBackend:
+    """ Toistaa sarkaimin erotetun tulostaulukon rivejä; ensimmäinen sarake on syötearvo. """
+
+    def __init__(self, table_path="results.txt", columns=RESULTS_TXT_COLUMNS, delay=0.0, on_message=print):
+        # delay simuloi Mathcadin laskenta-aikaa suorituskykymittauksissa (sekunteja / arvo)
+        self.delay = delay
+        self.on_message = on_message
+        self.rows = {}
+        with open(table_path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f, delimiter='\t'):
+                if row:
+                    values = [float(v) for v in row]
+                    self.rows[values[0]] = values
+        self.keys = sorted(self.rows)
+        self.columns = columns
+
+    def evaluate(self, value):
+        if self.delay:
+            time.sleep(self.delay)
+        value = float(value)
+        row = self.rows.get(value)
+        if row is None:
+            i = bisect_left(self.keys, value)
+            if i == 0 or i == len(self.keys):
+                return {}
+            a, b = self.rows[self.keys[i - 1]], self.rows[self.keys[i]]
+            t = (value - a[0]) / (b[0] - a[0])
+            row = [x + t * (y - x) for x, y in zip(a, b)]
+        return {name: (v, units) for (name, units), v in zip(self.columns, row[1:])}
+
+    def close(self):
+        pass
+
+
+class CachedBackend:
+    """ Hakee tuloksen välimuistista ennen varsinaista laskentaa. """
+
+    def __init__(self, backend_factory, worksheet_path, cache_dir=".mathcad_cache", on_message=print, **cache_options):
+        self.backend_factory = backend_factory
+        self.worksheet_path = worksheet_path
+        self.on_message = on_message
+        self.cache = ResultCache(cache_dir, **cache_options)
+        # Varsinainen tausta (esim. Mathcad) käynnistetään vasta ensimmäisellä ohilyönnillä
+        self.backend = None
+
+    def evaluate(self, value):
+        inputs = value if isinstance(value, dict) else {"Input1": value}
+        with stage("cache_lookup"):
+            outputs = self.cache.get(self.worksheet_path, inputs)
+        if outputs is not None:
+            self.on_message(f"Cached result for input {value}")
+            return outputs
+
+        if self.backend is None:
+            self.backend = self.backend_factory(on_message=self.on_message)
+        outputs = self.backend.evaluate(value)
+        if outputs:
+            self.cache.put(self.worksheet_path, inputs, outputs)
+        return outputs
+
+    def close(self):
+        # Välimuistin siivous (evict) tehdään ajon lopuksi pääprosessissa, ei jokaisessa työprosessissa
+        if self.backend is not None:
+            self.backend.close()
@@ -0,0 +1,125 @@
+"""
+Monen syötteen laskentasarjat.
+
+Tavallinen ajo muuttaa vain laskentalehden ensimmäistä syötettä. Tällä moduulilla muodostetaan
+syöteyhdistelmät usealle aliakselle kerralla (esim. fck, fii, b, myyS, myyC) ja järjestetään ne niin,
+että peräkkäisten laskentojen välillä muuttuu mahdollisimman vähän syötteitä. Jokainen muuttunut
+syöte laukaisee laskentalehden uudelleenlaskennan, joten järjestys vaikuttaa suoraan ajoaikaan.
+
+Yhdistelmä on sanakirja {alias: arvo}. Tavat muodostaa yhdistelmät:
+    cartesian   kaikki yhdistelmät; järjestetään heijastettuun Gray-järjestykseen (käärme), jolloin
+                peräkkäisissä yhdistelmissä muuttuu aina täsmälleen yksi syöte
+    zip         listat rinnakkain: i:s yhdistelmä = jokaisen listan i:s arvo
+    table       CSV-taulukko, jonka otsikkorivillä on aliakset
+
+Määrittelytiedosto (JSON), esim.:
+    {"mode": "cartesian", "inputs": {"fck": [30, 35, 40], "b": {"start": 200, "end": 300, "step": 50}}}
+    {"mode": "zip", "inputs": {"fck": [30, 40], "fii": [16, 20]}}
+    {"mode": "table", "file": "yhdistelmat.csv"}
+"""
+
+import csv
+import json
+import os
+
+
+def _axis_values(values):
+    """ Akselin arvot listana; {"start", "end", "step"} laajennetaan tasaväliseksi listaksi. """
+    if isinstance(values, dict):
+        start, end, step = values["start"], values["end"], values.get("step", 1)
+        count = int((end - start) / step + 1e-9) + 1
+        return [start + i * step for i in range(count)]
+    return list(values)
+
+
+def cartesian(axes):
+    """ Kaikki yhdistelmät heijastetussa Gray-järjestyksessä: viimeinen akseli muuttuu nopeimmin ja
+    vaihtaa suuntaa joka kierroksella, joten peräkkäiset yhdistelmät eroavat yhdellä syötteellä. """
+    points = [{}]
+    for alias, values in axes.items():
+        values = _axis_values(values)
+        expanded = []
+        for i, point in enumerate(points):
+            for value in (values if i % 2 == 0 else reversed(values)):
+                expanded.append({**point, alias: value})
+        points = expanded
+    return points
+
+
+def zipped(axes):
+    """ Listat rinnakkain; kaikkien listojen pitää olla yhtä pitkiä. """
+    columns = {alias: _axis_values(values) for alias, values in axes.items()}
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Zipped input lists have different lengths: {sorted(lengths)}")
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def table(path, delimiter=','):
+    """ CSV-taulukon rivit yhdistelmiksi; otsikkorivillä ovat syötteiden aliakset. """
+    with open(path, newline='', encoding='utf-8') as f:
+        return [{alias: float(value) for alias, value in row.items()}
+                for row in csv.DictReader(f, delimiter=delimiter)]
+
+
+def load_spec(path):
+    """ Lukee JSON-määrittelyn ja palauttaa yhdistelmät määrittelyn järjestyksessä. Toistuvat
+    poistetaan ja järjestys tehdään vasta ajossa (schedule), kun päiväkirjan valmiit tiedetään. """
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+
+    mode = spec.get("mode", "cartesian")
+    if mode == "cartesian":
+        points = cartesian(spec["inputs"])
+    elif mode == "zip":
+        points = zipped(spec["inputs"])
+    elif mode == "table":
+        # Taulukon polku suhteessa määrittelytiedostoon
+        table_path = os.path.join(os.path.dirname(os.path.abspath(path)), spec["file"])
+        points = table(table_path, spec.get("delimiter", ','))
+    else:
+        raise ValueError(f"Unknown grid mode: {mode}")
+    return points
+
+
+def point_key(point):
+    """ Vertailuavain yhdistelmälle: aliakset aakkosjärjestyksessä, arvot liukulukuina. """
+    return tuple(sorted((alias, float(value)) for alias, value in point.items()))
+
+
+def changed_inputs(previous, point):
+    """ Syötteet, joiden arvo eroaa edellisestä yhdistelmästä. """
+    return [alias for alias, value in point.items() if previous.get(alias) != value]
+
+
+def schedule(points, done=None):
+    """ Poistaa toistuvat ja jo lasketut (done = joukko point_key-avaimia) yhdistelmät ja järjestää
+    loput ahneesti niin, että seuraavaksi lasketaan yhdistelmä, jossa muuttuu vähiten syötteitä. """
+    done = done or set()
+    seen = set()
+    unique = []
+    for point in points:
+        key = point_key(point)
+        if key not in seen and key not in done:
+            seen.add(key)
+            unique.append(point)
+
+    # Valmiiksi hyvässä järjestyksessä oleva lista (esim. cartesian) jätetään ennalleen
+    if all(len(changed_inputs(a, b)) <= 1 for a, b in zip(unique, unique[1:])):
+        return unique
+
+    ordered = [unique.pop(0)] if unique else []
+    while unique:
+        previous = ordered[-1]
+        # Tasatilanteessa alkuperäinen järjestys säilyy (min palauttaa ensimmäisen)
+        best = min(range(len(unique)), key=lambda i: len(changed_inputs(previous, unique[i])))
+        ordered.append(unique.pop(best))
+    return ordered
+
+
+def count_changes(points):
+    """ Syötteiden muutosten kokonaismäärä järjestyksessä (ensimmäinen yhdistelmä asettaa kaikki). """
+    total = len(points[0]) if points else 0
+    for a, b in zip(points, points[1:]):
+        total += len(changed_inputs(a, b))
+    return total
@@ -0,0 +1,87 @@
+"""
+Laskentasarjan kaatumisen kestävä päiväkirja.
+
+Jokainen valmis syötearvo kirjoitetaan heti omaksi JSON-rivikseen ja tiedosto synkronoidaan levylle
+(flush + fsync), joten Mathcadin tai Pythonin kaatuessa (vrt. traceback.log) menetetään korkeintaan
+kesken ollut arvo. Jatkotilassa (resume) jo kirjatut arvot ohitetaan ja lasketaan vain puuttuvat.
+
+Tiedoston muoto (JSON Lines):
+    {"worksheet": "<polku>"}                                          ensimmäinen rivi
+    {"value": 5, "outputs": [["alias", RealResult, "Units"], ...]}    yksi rivi arvoa kohden
+
+Usean syötteen ajossa "value" on sanakirja {alias: arvo}.
+
+Olemassa olevaa, ei-tyhjää päiväkirjaa ei kirjoiteta vahingossa yli: ilman resume- tai
+overwrite-valintaa avaus päättyy FileExistsError-virheeseen.
+"""
+
+import json
+import os
+
+from sweep_grid import point_key
+
+
+def value_key(value):
+    """ Päiväkirjan avain: luku liukulukuna, syöteyhdistelmä point_key-avaimena. """
+    return point_key(value) if isinstance(value, dict) else float(value)
+
+
+class SweepJournal:
+    """ Vain lisäävä päiväkirja valmiista (syötearvo -> tulokset) -pareista. """
+
+    def __init__(self, path, worksheet_path, resume=False, overwrite=False):
+        self.path = path
+        self.worksheet_path = worksheet_path
+        self.completed = {}
+
+        if resume and os.path.exists(path):
+            self.completed = self._read()
+            self.file = open(path, 'a', encoding='utf-8')
+            # Vajaa viimeinen rivi päätetään, ettei seuraava kirjaus liity siihen
+            if self.file.tell() > 0 and not self._ends_with_newline():
+                self.file.write("\n")
+        else:
+            if not overwrite and os.path.exists(path) and os.path.getsize(path) > 0:
+                raise FileExistsError(f"Journal {path} already exists; resume it or overwrite it explicitly")
+            self.file = open(path, 'w', encoding='utf-8')
+            self._write({"worksheet": worksheet_path})
+
+    def _read(self):
+        completed = {}
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        if lines:
+            header = json.loads(lines[0])
+            if header.get("worksheet") != self.worksheet_path:
+                raise ValueError(f"Journal {self.path} belongs to {header.get('worksheet')}, not {self.worksheet_path}")
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Kaatuminen kesken kirjoituksen jättää viimeisen rivin vajaaksi
+                continue
+            completed[value_key(record["value"])] = {alias: (result, units) for alias, result, units in record["outputs"]}
+        return completed
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def is_done(self, value):
+        return value_key(value) in self.completed
+
+    def get(self, value):
+        return self.completed[value_key(value)]
+
+    def append(self, value, outputs):
+        self._write({"value": value, "outputs": [[alias, result, units] for alias, (result, units) in outputs.items()]})
+        self.completed[value_key(value)] = outputs
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,79 @@
+"""
+Laskentasarjan tulosten sarakemuotoinen tallennus.
+
+Jokaisen kierroksen kaikki tulokset lisätään tyypitettyihin sarakkeisiin (float64) ja tallennetaan
+kansioon NumPy .npy -tiedostoina. Yksiköt ja aliakset ovat meta.json-tiedostossa. Jatkovaiheet voivat
+muistikuvata koko sarjan (load_sweep, mmap_mode='r') sen sijaan että jäsentäisivät tekstitiedostoja.
+
+Kansion rakenne:
+    meta.json       {"rows": n, "input": "input.npy", "columns": [{"alias", "units", "file"}, ...]}
+    input.npy       syötearvot
+    col000.npy ...  yksi tiedosto tulosta kohden, puuttuva arvo = NaN
+
+Usean syötteen ajossa input.npy on rivin järjestysnumero ja jokainen syöte tallennetaan omaksi
+sarakkeekseen (meta.json: "input": true).
+"""
+
+import json
+import os
+from array import array
+
+
+class ColumnRecorder:
+    """ Kerää kierrosten tulokset sarakkeisiin muistissa. """
+
+    def __init__(self):
+        self.values = array('d')
+        self.columns = {}
+        self.units = {}
+        self.input_aliases = set()
+
+    def append(self, value, outputs):
+        """ Lisää rivin; outputs on {alias: (RealResult, Units)}. """
+        row = len(self.values)
+        if isinstance(value, dict):
+            self.values.append(row)
+            self.input_aliases.update(value)
+            outputs = {**{alias: (v, "") for alias, v in value.items()}, **outputs}
+        else:
+            self.values.append(value)
+        for alias, (result, units) in outputs.items():
+            if alias not in self.columns:
+                # Myöhemmin ilmestynyt tulos: aiemmat rivit täytetään NaN-arvolla
+                self.columns[alias] = array('d', [float('nan')] * row)
+                self.units[alias] = units
+            self.columns[alias].append(result)
+        for column in self.columns.values():
+            if len(column) == row:
+                column.append(float('nan'))
+
+    def save(self, directory):
+        import numpy as np
+
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'input.npy'), np.frombuffer(self.values, dtype=np.float64))
+        meta_columns = []
+        for i, (alias, column) in enumerate(self.columns.items()):
+            file_name = f'col{i:03d}.npy'
+            np.save(os.path.join(directory, file_name), np.frombuffer(column, dtype=np.float64))
+            meta_columns.append({"alias": alias, "units": self.units[alias], "file": file_name,
+                                 "input": alias in self.input_aliases})
+
+        meta = {"rows": len(self.values), "input": "input.npy", "columns": meta_columns}
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+
+def load_sweep(directory, mmap_mode='r'):
+    """ Lukee tallennetun sarjan: (syötearvot, {alias: sarake}, {alias: yksikkö}). """
+    import numpy as np
+
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    values = np.load(os.path.join(directory, meta["input"]), mmap_mode=mmap_mode)
+    columns = {}
+    units = {}
+    for column in meta["columns"]:
+        columns[column["alias"]] = np.load(os.path.join(directory, column["file"]), mmap_mode=mmap_mode)
+        units[column["alias"]] = column["units"]
+    return values, columns, units
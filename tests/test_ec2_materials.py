@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from ec2_materials import (bilinear_concrete, concrete_class, concrete_stress, concrete_table, design_strengths,
+                           parabola_rectangle)
+
+# EN 1992-1-1 taulukko 3.1: fck, fctm, fctk0,05, fctk0,95, Ecm [GPa], εc1, εcu1, εc2, εcu2, n, εc3, εcu3 [‰]
+TABLE_3_1 = [
+    (12, 1.6, 1.1, 2.0, 27, 1.8, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (16, 1.9, 1.3, 2.5, 29, 1.9, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (20, 2.2, 1.5, 2.9, 30, 2.0, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (25, 2.6, 1.8, 3.3, 31, 2.1, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (30, 2.9, 2.0, 3.8, 33, 2.2, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (35, 3.2, 2.2, 4.2, 34, 2.25, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (40, 3.5, 2.5, 4.6, 35, 2.3, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (45, 3.8, 2.7, 4.9, 36, 2.4, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (50, 4.1, 2.9, 5.3, 37, 2.45, 3.5, 2.0, 3.5, 2.0, 1.75, 3.5),
+    (55, 4.2, 3.0, 5.5, 38, 2.5, 3.2, 2.2, 3.1, 1.75, 1.8, 3.1),
+    (60, 4.4, 3.1, 5.7, 39, 2.6, 3.0, 2.3, 2.9, 1.6, 1.9, 2.9),
+    (70, 4.6, 3.2, 6.0, 41, 2.7, 2.8, 2.4, 2.7, 1.45, 2.0, 2.7),
+    (80, 4.8, 3.4, 6.3, 42, 2.8, 2.8, 2.5, 2.6, 1.4, 2.2, 2.6),
+    (90, 5.0, 3.5, 6.6, 44, 2.8, 2.8, 2.6, 2.6, 1.4, 2.3, 2.6),
+]
+
+
+@pytest.mark.parametrize("row", TABLE_3_1, ids=[f"C{row[0]}" for row in TABLE_3_1])
+def test_concrete_class_matches_table_3_1(row):
+    fck, fctm, fctk_005, fctk_095, ecm, eps_c1, eps_cu1, eps_c2, eps_cu2, n, eps_c3, eps_cu3 = row
+    c = concrete_class(fck)
+
+    # Taulukon arvot on pyöristetty viimeiseen esitettyyn numeroon
+    assert c.fcm == fck + 8
+    assert c.fctm == pytest.approx(fctm, abs=0.051)
+    # fctk-arvot on taulukossa laskettu pyöristetystä fctm:stä (C60: 0,7 · 4,4 = 3,08 -> 3,1)
+    assert c.fctk_005 == pytest.approx(fctk_005, abs=0.06)
+    assert c.fctk_095 == pytest.approx(fctk_095, abs=0.06)
+    assert c.Ecm / 1000 == pytest.approx(ecm, abs=0.51)
+    assert c.eps_c1 * 1000 == pytest.approx(eps_c1, abs=0.051)
+    assert c.eps_cu1 * 1000 == pytest.approx(eps_cu1, abs=0.051)
+    assert c.eps_c2 * 1000 == pytest.approx(eps_c2, abs=0.051)
+    assert c.eps_cu2 * 1000 == pytest.approx(eps_cu2, abs=0.051)
+    # n on taulukossa 0,05:n tarkkuudella (C70: 1,437 -> 1,45)
+    assert c.n == pytest.approx(n, abs=0.026)
+    assert c.eps_c3 * 1000 == pytest.approx(eps_c3, abs=0.051)
+    assert c.eps_cu3 * 1000 == pytest.approx(eps_cu3, abs=0.051)
+
+
+def test_concrete_table_broadcasts_classes():
+    table = concrete_table((30, 60, 90), ndim=1)
+    assert table.n.shape == (3, 1)
+    eps = np.array([0.0, 0.001, 0.002, 0.0025])
+    sigma = parabola_rectangle(eps, table.eps_c2, table.eps_cu2, 20.0, table.n)
+    assert sigma.shape == (3, 4)
+
+    # C30: n = 2, εc2 = 2,0 ‰
+    assert sigma[0].tolist() == pytest.approx([0.0, 15.0, 20.0, 20.0])
+    # C60: n = 1,4 + 23,4 · 0,3⁴ = 1,5895, εc2 = 2 + 0,085 · 10^0,53 = 2,288 ‰ (taulukossa 1,6 ja 2,3 ‰)
+    assert sigma[1, 1:3].tolist() == pytest.approx([11.9762, 19.2580], abs=1e-4)
+    # C90: n = 1,4, εc2 = 2,600 ‰, εcu2 = 2,6 ‰ -> 2,5 ‰ on vielä sallittu
+    assert sigma[2, 1:3].tolist() == pytest.approx([9.8630, 17.4304], abs=1e-4)
+    assert sigma[2, 3] < 20.0
+
+    # concrete_stress käyttää samaa luokan n:ää yhdelle luokalle ja usealle kerralla
+    assert np.allclose(concrete_stress(eps, (30, 60, 90), 20.0), sigma)
+    assert np.allclose(concrete_stress(eps, 60, 20.0), sigma[1])
+
+
+def test_stress_functions_cut_at_ultimate_strain():
+    c = concrete_class(30)
+    eps = np.array([-0.001, 0.0, c.eps_c3 / 2, c.eps_cu3, c.eps_cu3 + 1e-6])
+    sigma = bilinear_concrete(eps, c.eps_c3, c.eps_cu3, 17.0)
+    assert sigma[:4].tolist() == [0.0, 0.0, 8.5, 17.0]
+    assert np.isnan(sigma[4])
+
+
+def test_design_strengths():
+    fck, fcd, fyd = design_strengths(30, 500, alpha_cc=0.85, myy_c=0.9)
+    assert fck == pytest.approx(27.0)
+    assert fcd == pytest.approx(0.85 * 27.0 / 1.5)
+    assert fyd == pytest.approx(500 / 1.15)
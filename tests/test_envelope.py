@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from envelope import curves_at, inner_envelope
+
+
+def test_envelope_switches_curve_at_exact_crossing():
+    # |x| leikkaa kohdassa y = 2,5, joka ei ole kummankaan käyrän pisteissä
+    a = ([0.0, 1.0, 4.0], [0.0, 2.0, 4.0])
+    b = ([3.0, 2.0, 1.0], [0.0, 2.0, 4.0])
+    x, y = inner_envelope([a, b])
+
+    assert y[0] == 4.0 and y[-1] == 0.0
+    assert np.all(np.diff(y) < 0)
+    k = np.flatnonzero(np.isclose(y, 2.5))
+    assert len(k) == 1
+    # Leikkauspisteessä molemmat käyrät ovat yhtä kaukana akselista
+    assert x[k[0]] == pytest.approx(1.75)
+    expected = np.abs(curves_at([(np.array(c[0]), np.array(c[1])) for c in (a, b)], y)).min(axis=0)
+    assert np.allclose(np.abs(x), expected)
+
+
+def test_envelope_keeps_sign_of_chosen_curve():
+    a = ([-1.0, -1.0], [0.0, 10.0])
+    b = ([2.0, 2.0], [0.0, 10.0])
+    x, y = inner_envelope([a, b])
+    assert np.all(x == -1.0)
+
+
+def test_envelope_uses_common_y_range():
+    a = ([1.0, 1.0, 1.0], [-5.0, 0.0, 5.0])
+    b = ([2.0, 2.0], [-2.0, 8.0])
+    x, y = inner_envelope([a, b])
+    assert (y.max(), y.min()) == (5.0, -2.0)
+
+
+def test_envelope_of_disjoint_curves_is_empty():
+    x, y = inner_envelope([([1.0, 1.0], [0.0, 1.0]), ([1.0, 1.0], [2.0, 3.0])])
+    assert len(x) == 0 and len(y) == 0
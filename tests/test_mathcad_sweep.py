@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+import mathcad_sweep
+
+
+class SumBackend:
+    def __init__(self, on_message=print):
+        pass
+
+    def evaluate(self, value):
+        return {"N": (float(value) * 10, "kN")}
+
+    def close(self):
+        pass
+
+
+def quiet(event):
+    pass
+
+
+def test_cache_cannot_be_combined_with_hooks(tmp_path):
+    worksheet = tmp_path / "sheet.mcdx"
+    worksheet.write_bytes(b"worksheet")
+    with pytest.raises(ValueError):
+        mathcad_sweep.run_sweep(str(worksheet), 1, 3, backend_factory=SumBackend, on_event=quiet,
+                                cache_dir=str(tmp_path / "cache"), hooks=[lambda value, outputs: None])
+
+
+def test_cache_eviction_uses_configured_limits(tmp_path):
+    worksheet = tmp_path / "sheet.mcdx"
+    worksheet.write_bytes(b"worksheet")
+    cache_dir = tmp_path / "cache"
+    results = mathcad_sweep.run_sweep(str(worksheet), 1, 5, backend_factory=SumBackend, on_event=quiet,
+                                      cache_dir=str(cache_dir), cache_options={"max_bytes": 0})
+    assert [result for _, result, _ in results] == [10.0, 20.0, 30.0, 40.0, 50.0]
+    assert not [name for _, _, files in os.walk(cache_dir) for name in files if name.endswith(".json")]
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+
+import nm_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Laskentalehden 1-NM-Kuvaaja-Current.mcdx tallentamat tulokset (j ja ChartData) tuotteelle 400-217-140 8D28-960.
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "400-217-140 8D28-960")
+
+PARAMETERS = {
+    "Nimi": "Jatkos 200 P0", "b": 200, "lv": 80, "lv2": 0, "fii": 20, "fiieff": 20, "fyk": 500, "Es": 200,
+    "fck": 30, "alphaCC": 0.85, "gammaC": 1.5, "gammaS": 1.15, "gammaP": 1, "myyS": 1, "myyC": 0.9,
+    "tkb": 1, "Cmodel": 2,
+}
+
+
+def write_test_file(path, **figures):
+    rows = {**PARAMETERS, **figures}
+    path.write_text("".join(f"{key},{value}\n" for key, value in rows.items()), encoding="utf-8")
+    return str(path)
+
+
+def test_mathcad_round_rounds_halves_away_from_zero():
+    assert nm_engine.mathcad_round(2.5) == 3
+    assert nm_engine.mathcad_round(-2.5) == -3
+    assert nm_engine.mathcad_round(1.25, 1) == 1.3
+
+
+def test_zero_force_moment_interpolates_sign_change():
+    m = np.array([0.0, 10.0, 20.0])
+    n = np.array([100.0, 50.0, -50.0])
+    assert nm_engine.zero_force_moment(m, n) == pytest.approx(15.0)
+
+
+def test_section_integration_matches_results_txt():
+    report = nm_engine.check_section_integration(os.path.join(ROOT, "results.txt"))
+    assert report["rows"] == 101
+    assert report["N_max_error"] < 1e-3 * report["N_range"]
+    assert report["M_max_error"] < 1e-3 * report["M_range"]
+
+
+def test_uls_results_match_worksheet_reference():
+    report = nm_engine.compare_with_worksheet(REFERENCE + ".csv", REFERENCE + "-chart.csv")
+    assert report["points"] == 64
+    # Käyrät: ero alle 0,1 % käyrän vaihteluvälistä (nyt noin 0,18 kN / 7790 kN ja 0,03 kNm / 326 kNm).
+    assert report["N_max_error"] < 1e-3 * report["N_range"]
+    assert report["M_max_error"] < 1e-3 * report["M_range"]
+    # Tunnusluvut pyöristetään datalehdelle kokonaisiksi, joten niiden pitää täsmätä tarkasti.
+    assert report["Nmax"] == (5649, 5649)
+    assert report["Nmin"] == (-2142, -2142)
+    assert report["NMmax"] == (252, 252)
+
+
+def test_compare_with_worksheet_reports_differences(tmp_path):
+    params = nm_engine.read_parameters(write_test_file(tmp_path / "p.csv"))
+    results = nm_engine.uls_results(params)
+    test_file = write_test_file(tmp_path / "p.csv", Nmax=results["Nmax"], Nmin=results["Nmin"] + 1,
+                                NMmax=results["NMmax"])
+
+    chart = [row.copy() for row in results["chart"]]
+    chart[3][10] += 2.0
+    chart_file = str(tmp_path / "p-chart.csv")
+    nm_engine.write_chart_csv(chart, chart_file)
+
+    report = nm_engine.compare_with_worksheet(test_file, chart_file)
+    assert report["points"] == len(chart[0])
+    assert report["N_max_error"] == pytest.approx(2.0)
+    assert report["M_max_error"] == 0.0
+    assert report["Nmax"][0] == report["Nmax"][1]
+    assert report["Nmin"][1] - report["Nmin"][0] == 1
+
+
+def test_compare_with_worksheet_rejects_other_strain_states(tmp_path):
+    test_file = write_test_file(tmp_path / "p.csv")
+    chart_file = tmp_path / "p-chart.csv"
+    chart_file.write_text("1,2\n3,4\n5,6\n7,8\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        nm_engine.compare_with_worksheet(test_file, str(chart_file))
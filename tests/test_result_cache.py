@@ -0,0 +1,56 @@
+import os
+
+from result_cache import ResultCache
+
+
+def make_cache(tmp_path):
+    worksheet = tmp_path / "sheet.mcdx"
+    worksheet.write_bytes(b"worksheet")
+    return ResultCache(str(tmp_path / "cache")), str(worksheet)
+
+
+def test_key_is_stable_and_order_independent(tmp_path):
+    cache, worksheet = make_cache(tmp_path)
+    key = cache.key(worksheet, {"b": 5, "fck": 30})
+    assert cache.key(worksheet, {"fck": 30, "b": 5}) == key
+    assert ResultCache(str(tmp_path / "cache")).key(worksheet, {"b": 5, "fck": 30}) == key
+    assert len(key) == 64
+
+
+def test_key_normalises_numbers(tmp_path):
+    cache, worksheet = make_cache(tmp_path)
+    assert cache.key(worksheet, {"Input1": 5}) == cache.key(worksheet, {"Input1": 5.0})
+    assert cache.key(worksheet, {"Input1": 5}) != cache.key(worksheet, {"Input1": 6})
+
+
+def test_key_changes_with_worksheet(tmp_path):
+    cache, worksheet = make_cache(tmp_path)
+    key = cache.key(worksheet, {"Input1": 1})
+    with open(worksheet, "ab") as f:
+        f.write(b" changed")
+    assert cache.key(worksheet, {"Input1": 1}) != key
+
+
+def test_put_get_round_trip(tmp_path):
+    cache, worksheet = make_cache(tmp_path)
+    cache.put(worksheet, {"Input1": 2}, {"N": (12.5, "kN")})
+    assert cache.get(worksheet, {"Input1": 2.0}) == {"N": (12.5, "kN")}
+    assert cache.get(worksheet, {"Input1": 3}) is None
+
+
+def test_evict_skips_missing_files(tmp_path, monkeypatch):
+    cache, worksheet = make_cache(tmp_path)
+    cache.max_bytes = 0
+    for value in range(3):
+        cache.put(worksheet, {"Input1": value}, {"N": (value, "kN")})
+
+    # Toinen prosessi on poistanut tiedoston listauksen jälkeen
+    real_walk = os.walk
+
+    def walk_with_removed(top):
+        for root, dirs, files in real_walk(top):
+            yield root, dirs, files + ["gone.json"] if files else files
+
+    monkeypatch.setattr(os, "walk", walk_with_removed)
+    assert cache.evict() == 3
+    assert cache.get(worksheet, {"Input1": 0}) is None
@@ -0,0 +1,31 @@
+import csv
+import os
+
+import sls_engine
+import yhdistys4
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARAMETERS = {"b": 200.0, "lv": 80.0, "fii": 20.0, "fck": 30.0, "fyk": 500.0, "Es": 200.0, "myyC": 1.0,
+              "myyS": 1.0}
+
+
+def test_results_txt_within_tolerance():
+    errors = sls_engine.validate_results_txt(os.path.join(ROOT, "results.txt"))
+    worst = max(errors, key=errors.get)
+    assert errors[worst] < 1e-3, worst
+
+
+def test_kierot_zero_does_not_collide_with_merged_curve(tmp_path):
+    results = sls_engine.evaluate_product(PARAMETERS)
+    sls_engine.write_outputs(results, str(tmp_path))
+
+    names = set(os.listdir(tmp_path))
+    assert {"SLS-chart-SLS-0-0.csv", "SLS-chart-SLS-1-0.csv", "SLS-data-1-0.csv"} <= names
+    assert "SLS-chart-SLS-0.csv" not in names and "SLS-chart-SLS-1.csv" not in names
+    # yhdistys4 yhdistää vain osat 1 ja 2
+    assert yhdistys4.discover_cases(str(tmp_path)) == {0: [1, 2], 1: [1, 2]}
+
+    with open(tmp_path / "SLS-data-1-0.csv", newline='', encoding='utf-8') as f:
+        data = {key: float(value) for key, value in csv.reader(f)}
+    assert data == results[(1, 0)]["data"]
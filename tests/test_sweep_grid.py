@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from sweep_grid import cartesian, changed_inputs, count_changes, load_spec, point_key, schedule, zipped
+from sweep_journal import SweepJournal
+
+
+def test_cartesian_is_snake_ordered():
+    points = cartesian({"fck": [30, 35], "b": [200, 250, 300]})
+    assert [(p["fck"], p["b"]) for p in points] == [
+        (30, 200), (30, 250), (30, 300), (35, 300), (35, 250), (35, 200)]
+    assert all(len(changed_inputs(a, b)) == 1 for a, b in zip(points, points[1:]))
+
+
+def test_cartesian_three_axes_changes_one_input_per_step():
+    points = cartesian({"fck": [30, 35, 40], "fii": [16, 20], "b": {"start": 200, "end": 300, "step": 50}})
+    assert len(points) == 18
+    assert len({point_key(p) for p in points}) == 18
+    assert count_changes(points) == 3 + 17
+
+
+def test_point_key_ignores_order_and_number_type():
+    assert point_key({"b": 5, "fck": 30}) == point_key({"fck": 30.0, "b": 5.0})
+    assert point_key({"b": 5}) != point_key({"b": 6})
+
+
+def test_point_key_round_trips_through_journal(tmp_path):
+    path = str(tmp_path / "grid.jsonl")
+    journal = SweepJournal(path, "a.mcdx")
+    journal.append({"fck": 30, "b": 200}, {"N": (1.0, "kN")})
+    journal.close()
+
+    resumed = SweepJournal(path, "a.mcdx", resume=True)
+    assert resumed.is_done({"b": 200.0, "fck": 30})
+    assert resumed.get({"b": 200, "fck": 30}) == {"N": (1.0, "kN")}
+    resumed.close()
+
+
+def test_schedule_removes_duplicates_and_done():
+    points = [{"a": 1, "b": 1}, {"a": 2, "b": 2}, {"a": 1, "b": 1}, {"a": 1, "b": 2}]
+    ordered = schedule(points, done={point_key({"a": 2, "b": 2})})
+    assert ordered == [{"a": 1, "b": 1}, {"a": 1, "b": 2}]
+
+
+def test_schedule_reduces_input_changes():
+    points = zipped({"a": [1, 2, 1, 2], "b": [1, 2, 2, 1]})
+    ordered = schedule(points)
+    assert sorted(map(point_key, ordered)) == sorted(map(point_key, points))
+    assert count_changes(ordered) < count_changes(points)
+
+
+def test_load_spec_keeps_specification_order(tmp_path):
+    spec = tmp_path / "grid.json"
+    spec.write_text(json.dumps({"mode": "zip", "inputs": {"a": [2, 1, 2], "b": [5, 5, 5]}}), encoding="utf-8")
+    assert load_spec(str(spec)) == [{"a": 2, "b": 5}, {"a": 1, "b": 5}, {"a": 2, "b": 5}]
+
+
+def test_zipped_rejects_different_lengths():
+    with pytest.raises(ValueError):
+        zipped({"a": [1, 2], "b": [1]})
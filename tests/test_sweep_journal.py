@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from sweep_journal import SweepJournal
+
+
+def write_journal(path, worksheet, records, tail=""):
+    lines = [json.dumps({"worksheet": worksheet})] + [json.dumps(record) for record in records]
+    path.write_text("\n".join(lines) + "\n" + tail, encoding="utf-8")
+
+
+def test_resume_skips_partial_last_line(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    write_journal(path, "a.mcdx", [{"value": 1, "outputs": [["N", 10.0, "kN"]]},
+                                   {"value": 2, "outputs": [["N", 20.0, "kN"]]}],
+                  tail='{"value": 3, "outputs": [["N", 3')
+
+    journal = SweepJournal(str(path), "a.mcdx", resume=True)
+    assert journal.is_done(1) and journal.is_done(2.0)
+    assert not journal.is_done(3)
+    assert journal.get(2) == {"N": (20.0, "kN")}
+    journal.append(3, {"N": (30.0, "kN")})
+    journal.close()
+
+    # Vajaa rivi päätettiin, joten uusi kirjaus on omalla rivillään ja luetaan seuraavassa jatkossa
+    reopened = SweepJournal(str(path), "a.mcdx", resume=True)
+    assert reopened.get(3) == {"N": (30.0, "kN")}
+    reopened.close()
+
+
+def test_resume_with_grid_points(tmp_path):
+    path = tmp_path / "grid.jsonl"
+    write_journal(path, "a.mcdx", [{"value": {"b": 5, "fck": 30}, "outputs": [["N", 1.0, "kN"]]}])
+
+    journal = SweepJournal(str(path), "a.mcdx", resume=True)
+    assert journal.is_done({"fck": 30.0, "b": 5})
+    journal.close()
+
+
+def test_resume_rejects_other_worksheet(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    write_journal(path, "a.mcdx", [])
+    with pytest.raises(ValueError):
+        SweepJournal(str(path), "b.mcdx", resume=True)
+
+
+def test_existing_journal_is_not_truncated(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    write_journal(path, "a.mcdx", [{"value": 1, "outputs": [["N", 10.0, "kN"]]}])
+    before = path.read_text(encoding="utf-8")
+
+    with pytest.raises(FileExistsError):
+        SweepJournal(str(path), "a.mcdx")
+    assert path.read_text(encoding="utf-8") == before
+
+    journal = SweepJournal(str(path), "a.mcdx", overwrite=True)
+    journal.close()
+    assert path.read_text(encoding="utf-8").splitlines() == [json.dumps({"worksheet": "a.mcdx"})]
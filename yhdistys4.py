@@ -1,15 +1,20 @@
-import sys
-import pandas as pd
+import argparse
+import glob
+import os
+import re
+from multiprocessing import Pool
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy import interpolate
 import csv
 
+from envelope import inner_envelope
+
 """
 Ohjelman käyttö:
 ---------------
-Tämä ohjelma lukee kaksi CSV-tiedostoa, suodattaa tiettyjä koordinaatteja 
-ja tallentaa tulokset uuteen CSV-tiedostoon. 
+Tämä ohjelma lukee SLS-tapauksen osakäyrät (oletuksena kaksi CSV-tiedostoa), suodattaa tiettyjä
+koordinaatteja ja tallentaa niiden sisäverhokäyrän (envelope.inner_envelope) uuteen CSV-tiedostoon.
+Verhokäyrä sisältää kaikkien käyrien pisteet yhteisellä N-välillä sekä käyrien leikkauskohdat.
 
 Ohjelmalle voidaan antaa komentoriviparametri `input1`, joka on kokonaisluku (esim. 0 tai 1).
 Mikäli parametria ei anneta, oletusarvo on 0.
@@ -19,105 +24,148 @@ Esimerkki ajosta:
 
 Tiedostojen polut muodostuvat seuraavasti:
     - Input-tiedostot: ./TempFiles/SLS-chart-SLS-[input1]-1.csv ja ./TempFiles/SLS-chart-SLS-[input1]-2.csv
+      (main-funktion parts-parametrilla myös useampia osia -1, -2, -3, ...)
     - Output-tiedosto: ./TempFiles/SLS-chart-SLS-[input1].csv
-"""
 
-# Luetaan komentoriviparametri, oletuksena 0
-input1 = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+Kaikki tapaukset kerralla yhdessä prosessissa:
+    python yhdistys4.py --all [--workers 4] [--plots ./TempFiles/kuvat]
+
+--all etsii kansiosta kaikki SLS-chart-SLS-<n>-<osa>.csv-tiedostot ja yhdistää jokaisen tapauksen n,
+jolla on vähintään kaksi osaa. Osa 0 (sls_engine.py:n kierot = 0) on valmis käyrä eikä yhdistettävä osa,
+joten se jätetään pois. Kuvaikkunaa ei avata; --plots tallentaa kuvat PNG-tiedostoiksi
+(SLS-chart-SLS-<n>.png) ilman näyttöä.
+
+matplotlib tuodaan vasta piirrettäessä, joten pelkkä yhdistäminen käynnistyy nopeasti.
+
+Moduulina tuotuna (esim. mathcad_sweep.py --script yhdistys4.py) kutsutaan on_iteration-funktiota,
+jolloin input1 on laskentakierroksen syötearvo eikä kuvaikkunaa avata.
+"""
 
 def read_curve(filename):
     """Lukee CSV-tiedoston ja palauttaa x- ja y-koordinaatit listamuodossa."""
-    data = pd.read_csv(filename, header=None)
-    x = data.iloc[0, :].tolist()  # Ensimmäinen rivi: x-koordinaatit
-    y = data.iloc[1, :].tolist()  # Toinen rivi: y-koordinaatit
+    # Kaksirivinen tiedosto luetaan csv-moduulilla; pandas olisi tähän raskas
+    with open(filename, newline='') as csvfile:
+        rows = [row for row in csv.reader(csvfile) if row]
+    x = [float(v) for v in rows[0]]  # Ensimmäinen rivi: x-koordinaatit
+    y = [float(v) for v in rows[1]]  # Toinen rivi: y-koordinaatit
     return x, y
 
 def filter_coordinates(x, y, condition, select_best):
-    """Suodattaa koordinaatit ehdon perusteella ja säilyttää parhaan pisteen."""
-    valid_indices = [i for i in range(len(x)) if condition(x[i], y[i])]
-    if not valid_indices:
-        return x, y  # Ei löydetty sopivia pareja, palautetaan alkuperäiset
-
-    best_index = min(valid_indices, key=lambda i: y[i]) if select_best == min else max(valid_indices, key=lambda i: y[i])
-
-    new_x = [x[i] for i in range(len(x)) if i not in valid_indices or i == best_index]
-    new_y = [y[i] for i in range(len(y)) if i not in valid_indices or i == best_index]
-
-    return new_x, new_y
-
-# Tiedostojen polut dynaamisesti input1-arvon perusteella
-file1 = f'./TempFiles/SLS-chart-SLS-{input1}-1.csv'
-file2 = f'./TempFiles/SLS-chart-SLS-{input1}-2.csv'
-
-# Lue tiedot
-x1, y1 = read_curve(file1)
-x2, y2 = read_curve(file2)
-
-# Suodatetaan x=0 ja y>0 (valitaan pienin y)
-x1, y1 = filter_coordinates(x1, y1, lambda x, y: x == 0 and y > 0, min)
-x2, y2 = filter_coordinates(x2, y2, lambda x, y: x == 0 and y > 0, min)
-
-# Suodatetaan x=0 ja y<0 (valitaan suurin y)
-x1, y1 = filter_coordinates(x1, y1, lambda x, y: x == 0 and y < 0, max)
-x2, y2 = filter_coordinates(x2, y2, lambda x, y: x == 0 and y < 0, max)
+    """Suodattaa koordinaatit ehdon perusteella ja säilyttää parhaan pisteen.
 
-# Lasketaan tarkastelupiste y-arvo
-y_ref = (max(y1) + min(y1)) / 2
-
-# Lasketaan tarkasteluvektori tark_y
-rajat_y_min = min(y1[0], y2[0])
-rajat_y_max = max(y1[-1], y2[-1])
-rajat_y = (rajat_y_min, rajat_y_max)
-
-# Yhdistetään y1 ja y2 tark-vektoriksi
-tark = y1 + y2
-
-# Järjestetään tark vektori suurimmasta pienimpään
-tark_sorted = sorted(tark, reverse=True)
-
-# Poistetaan tark_sorted vektorin arvot, jotka ovat suurempia kuin rajat_y_min ja pienempiä kuin rajat_y_max
-tark_filtered = [val for val in tark_sorted if rajat_y_min >= val >= rajat_y_max]
-
-# Poistetaan duplikaatit tark_filtered vektorista
-tark_filtered_unique = list(dict.fromkeys(tark_filtered))
-
-print(f"Suodatettu tark vektori (arvot rajojen sisällä ilman duplikaatteja): {tark_filtered_unique}")
-
-def find_x_for_y(x, y, target_y):
-    """Etsii x-koordinaatin, joka vastaa tiettyä y-arvoa käyrällä."""
-    f = interpolate.interp1d(y, x, kind="linear", fill_value="extrapolate")
-    return f(target_y)
+    condition saa x- ja y-taulukot ja palauttaa totuusarvotaulukon."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = condition(x, y)
+    if not valid.any():
+        return x, y  # Ei löydetty sopivia pareja, palautetaan alkuperäiset
 
-# Läpi tark_filtered_unique vektori ja lasketaan x-arvot
-x_coords = []
-for target_y in tark_filtered_unique:
-    x1_at_y = find_x_for_y(x1, y1, target_y)
-    x2_at_y = find_x_for_y(x2, y2, target_y)
-    
-    if x1_at_y < x2_at_y:
-        x_coords.append(x1_at_y)
+    valid_indices = np.flatnonzero(valid)
+    best_index = valid_indices[np.argmin(y[valid]) if select_best == min else np.argmax(y[valid])]
+
+    keep = ~valid
+    keep[best_index] = True
+    return x[keep], y[keep]
+
+def plot_curves(ax, curves, parts, x_coords, y_coords):
+    """Piirtää osakäyrät ja verhokäyrän pisteet annettuun akseliin."""
+    for (x, y), part, marker in zip(curves, parts, "osv^<>"):
+        ax.plot(x, y, label=f"Käyrä {part}", marker=marker)
+
+    # Piirretään x-koordinaatit ja tark_filtered_unique arvot
+    ax.scatter(x_coords, y_coords, color="red", label="Tarkastelupisteet", zorder=5)
+
+    ax.set_xlabel("X")
+    ax.set_ylabel("Y")
+    ax.legend()
+    ax.set_title("Tarkastelupisteet käyrillä")
+
+def main(input1=0, show_plot=True, parts=(1, 2), folder='./TempFiles', plot_file=None):
+    """Yhdistää SLS-tapauksen input1 osakäyrät (parts) ja tallentaa tuloksen CSV-tiedostoon.
+
+    plot_file tallentaa kuvan tiedostoon ilman kuvaikkunaa (Figure, ei pyplot-tilaa)."""
+    # Tiedostojen polut dynaamisesti input1-arvon perusteella
+    curves = []
+    for part in parts:
+        x, y = read_curve(os.path.join(folder, f'SLS-chart-SLS-{input1}-{part}.csv'))
+
+        # Suodatetaan x=0 ja y>0 (valitaan pienin y) sekä x=0 ja y<0 (valitaan suurin y)
+        x, y = filter_coordinates(x, y, lambda x, y: (x == 0) & (y > 0), min)
+        x, y = filter_coordinates(x, y, lambda x, y: (x == 0) & (y < 0), max)
+        curves.append((x, y))
+
+    # Verhokäyrä käyrien yhteisellä y-välillä: pienin |x| jokaisessa pisteessä ja leikkauskohdissa
+    x_coords, tark_filtered_unique = inner_envelope(curves)
+
+    print(f"Verhokäyrän pisteet rajojen sisällä: {len(tark_filtered_unique)}")
+
+    # Kirjoitetaan tiedostoon dynaamisella nimellä
+    output_filename = os.path.join(folder, f'SLS-chart-SLS-{input1}.csv')
+
+    with open(output_filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(x_coords.tolist())
+        writer.writerow(tark_filtered_unique.tolist())
+
+    print(f"Tiedosto tallennettu nimellä: {output_filename}")
+
+    if plot_file:
+        from matplotlib.figure import Figure
+        fig = Figure()
+        plot_curves(fig.subplots(), curves, parts, x_coords, tark_filtered_unique)
+        fig.savefig(plot_file)
+
+    if not show_plot:
+        return output_filename
+
+    # Piirretään käyrät ja tulokset
+    import matplotlib.pyplot as plt
+    plot_curves(plt.gca(), curves, parts, x_coords, tark_filtered_unique)
+    plt.show()
+    return output_filename
+
+def discover_cases(folder='./TempFiles'):
+    """Etsii tapaukset ja niiden osat: {n: [osat]} tiedostoista SLS-chart-SLS-<n>-<osa>.csv.
+    Mukaan otetaan tapaukset, joilla on vähintään kaksi osaa; osa 0 (kierot = 0) ei ole osa."""
+    pattern = re.compile(r'SLS-chart-SLS-(\d+)-(\d+)\.csv$')
+    cases = {}
+    for path in glob.glob(os.path.join(folder, 'SLS-chart-SLS-*-*.csv')):
+        match = pattern.search(os.path.basename(path))
+        if match and int(match.group(2)) > 0:
+            cases.setdefault(int(match.group(1)), []).append(int(match.group(2)))
+    return {case: sorted(parts) for case, parts in sorted(cases.items()) if len(parts) >= 2}
+
+def _merge_case(case, parts, folder, plot_dir):
+    plot_file = os.path.join(plot_dir, f'SLS-chart-SLS-{case}.png') if plot_dir else None
+    return main(case, show_plot=False, parts=parts, folder=folder, plot_file=plot_file)
+
+def main_all(folder='./TempFiles', workers=1, plot_dir=None):
+    """Yhdistää kaikki kansion tapaukset; workers > 1 jakaa tapaukset prosesseille.
+    Palauttaa kirjoitettujen tiedostojen polut."""
+    cases = discover_cases(folder)
+    if plot_dir:
+        os.makedirs(plot_dir, exist_ok=True)
+    jobs = [(case, parts, folder, plot_dir) for case, parts in cases.items()]
+    if workers > 1 and len(jobs) > 1:
+        with Pool(min(workers, len(jobs))) as pool:
+            return pool.starmap(_merge_case, jobs)
+    return [_merge_case(*job) for job in jobs]
+
+def on_iteration(value, outputs):
+    """mathcad_sweep-koukku: yhdistää syötearvoa vastaavan SLS-tapauksen käyrät ilman kuvaikkunaa."""
+    main(int(value), show_plot=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge SLS part curves into their inner envelope.")
+    parser.add_argument("input1", nargs="?", type=int, default=0, help="SLS case index (default 0)")
+    parser.add_argument("--all", action="store_true", help="Merge every case found in the folder")
+    parser.add_argument("--folder", default="./TempFiles", help="Folder with SLS-chart-SLS-*.csv files")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes with --all")
+    parser.add_argument("--plots", metavar="DIR", help="Save plots as PNG files (no window) with --all")
+    args = parser.parse_args()
+
+    if args.all:
+        written = main_all(args.folder, args.workers, args.plots)
+        print(f"Yhdistetty {len(written)} tapausta")
     else:
-        x_coords.append(x2_at_y)
-
-# Kirjoitetaan tiedostoon dynaamisella nimellä
-output_filename = f'./TempFiles/SLS-chart-SLS-{input1}.csv'
-
-with open(output_filename, 'w', newline='') as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(x_coords)
-    writer.writerow(tark_filtered_unique)
-
-print(f"Tiedosto tallennettu nimellä: {output_filename}")
-
-# Piirretään käyrät ja tulokset
-plt.plot(x1, y1, label="Käyrä 1", marker="o")
-plt.plot(x2, y2, label="Käyrä 2", marker="s")
-
-# Piirretään x-koordinaatit ja tark_filtered_unique arvot
-plt.scatter(x_coords, tark_filtered_unique, color="red", label="Tarkastelupisteet", zorder=5)
-
-plt.xlabel("X")
-plt.ylabel("Y")
-plt.legend()
-plt.title("Tarkastelupisteet käyrillä")
-plt.show()
+        main(args.input1, folder=args.folder)